@@ -0,0 +1,162 @@
+import os
+from os import path
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+from typing import List, Dict, Any, Callable
+
+from database import csvdb_folder
+from csv_database import CsvDatabase
+from sqlite_database import SqliteDatabase
+
+
+languages: List[str] = ['java', 'go', 'js', 'python', 'dotnet']
+# an example file is usually replaced by a later release of the same package
+replaced_files_ratio: float = 0.5
+
+
+def generate_csv(work_dir: str, file_rows: int, files_per_release: int):
+    # synthesize index and list CSV files, with file_rows rows in the list
+
+    metadata_path = path.join(work_dir, csvdb_folder)
+    os.makedirs(metadata_path, exist_ok=True)
+    release_count = max(1, file_rows // files_per_release)
+    date_epoch = 1600000000
+
+    with open(path.join(metadata_path, 'java-library-example-index.csv'), 'w', newline='') as csv_file:
+        csv_writer = csv.writer(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csv_writer.writerow(['id', 'name', 'language', 'tag', 'package', 'version', 'date_epoch', 'date'])
+        for release_id in range(1, release_count + 1):
+            package = f'azure-resourcemanager-service{release_id}'
+            release_date_epoch = date_epoch + release_id * 60
+            csv_writer.writerow([release_id, f'com.azure.resourcemanager:{package}:1.0.0',
+                                 languages[release_id % len(languages)], f'{package}_1.0.0', package, '1.0.0',
+                                 release_date_epoch,
+                                 datetime.fromtimestamp(release_date_epoch).strftime('%m/%d/%Y')])
+
+    with open(path.join(metadata_path, 'java-library-example-list.csv'), 'w', newline='') as csv_file:
+        csv_writer = csv.writer(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        csv_writer.writerow(['id', 'file', 'release_id'])
+        for file_id in range(1, file_rows + 1):
+            release_id = min(release_count, (file_id - 1) // files_per_release + 1)
+            csv_writer.writerow([file_id, example_file(release_id, file_id), release_id])
+
+
+def commit_csv(work_dir: str):
+    # commit CSV files as the metadata repository, snapshot is keyed on the commit
+    metadata_path = path.join(work_dir, csvdb_folder)
+    subprocess.check_call(['git', 'init', '--quiet'], cwd=metadata_path)
+    subprocess.check_call(['git', 'add', '--all'], cwd=metadata_path)
+    subprocess.check_call(['git', '-c', 'user.name=benchmark', '-c', 'user.email=benchmark@benchmark',
+                           'commit', '--quiet', '-m', 'metadata'], cwd=metadata_path)
+
+
+def example_file(release_id: int, file_id: int) -> str:
+    return (f'specification/service{release_id}/resource-manager/Microsoft.Service{release_id}/stable/2021-10-01/'
+            f'examples-java/Operation{file_id}_Get.java')
+
+
+def measure(operation: Callable[[], Any]) -> Dict[str, Any]:
+    # time, and peak of memory allocated during the operation
+    # time includes the overhead of tracemalloc, compare it only among runs of this benchmark
+
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    operation()
+    seconds = time.perf_counter() - start_time
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'seconds': round(seconds, 6),
+        'peak_bytes': peak_bytes
+    }
+
+
+def benchmark(database: str, file_rows: int, files_per_release: int, new_releases: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as work_dir:
+        generate_csv(work_dir, file_rows, files_per_release)
+
+        if database == 'sqlite':
+            db = SqliteDatabase(work_dir, path.join(work_dir, 'csvdb.sqlite'))
+        else:
+            db = CsvDatabase(work_dir)
+
+        operations = {'load': measure(db.load)}
+        if database == 'csv':
+            operations['load_file_list'] = measure(lambda: db.file_db)
+
+            # load both tables from snapshot, saved by the first load of the committed CSV files
+            commit_csv(work_dir)
+            snapshot_dir = path.join(work_dir, 'snapshot')
+            snapshot_db = CsvDatabase(work_dir, snapshot_dir)
+            snapshot_db.load()
+            snapshot_db.file_db
+            snapshot_db = CsvDatabase(work_dir, snapshot_dir)
+            operations['load_snapshot'] = measure(lambda: (snapshot_db.load(), snapshot_db.file_db))
+
+        def new_release():
+            release_count = max(1, file_rows // files_per_release)
+            replaced_count = int(files_per_release * replaced_files_ratio)
+            for index in range(new_releases):
+                # new version of existing package, replaces part of its files
+                release_id = release_count - index
+                package = f'azure-resourcemanager-service{release_id}'
+                first_file_id = (release_id - 1) * files_per_release + 1
+                files = [example_file(release_id, file_id)
+                         for file_id in range(first_file_id, first_file_id + replaced_count)]
+                files += [example_file(release_id, file_rows + index * files_per_release + file_id)
+                          for file_id in range(files_per_release - replaced_count)]
+                db.new_release(f'com.azure.resourcemanager:{package}:1.0.1', languages[release_id % len(languages)],
+                               f'{package}_1.0.1', package, '1.0.1', datetime.now(), files)
+
+        operations['new_release'] = measure(new_release)
+        operations['query_releases'] = measure(lambda: db.query_releases('java'))
+        operations['dump'] = measure(db.dump)
+
+        if isinstance(db, SqliteDatabase):
+            db.connection.close()
+
+    return {
+        'rows': file_rows,
+        'files_per_release': files_per_release,
+        'new_releases': new_releases,
+        'operations': operations
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of metadata database')
+    parser.add_argument('--rows', type=int, nargs='+', required=False, default=[10000, 100000, 1000000],
+                        help='Count of rows in file list')
+    parser.add_argument('--files-per-release', type=int, required=False, default=30,
+                        help='Count of example files in a release')
+    parser.add_argument('--new-releases', type=int, required=False, default=10,
+                        help='Count of releases added to database')
+    parser.add_argument('--database', type=str, required=False, default='csv', choices=['csv', 'sqlite'],
+                        help='Storage of database')
+    parser.add_argument('--output', type=str, required=False,
+                        help='Path of output JSON, default to stdout')
+    args = parser.parse_args()
+
+    results = {
+        'database': args.database,
+        'python': sys.version.split()[0],
+        'results': [benchmark(args.database, file_rows, args.files_per_release, args.new_releases)
+                    for file_rows in args.rows]
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f_out:
+            json.dump(results, f_out, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
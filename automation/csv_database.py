@@ -1,148 +1,424 @@
+import os
 from os import path
+import sys
+import io
+import locale
+import bisect
+import itertools
 import logging
 import csv
+import pickle
 import subprocess
-import dataclasses
 from datetime import datetime
-import re
-from typing import List, Union
+from array import array
+from typing import List, Dict, Set, FrozenSet, Tuple, Optional, Union, Type, Callable, Any, Iterable, Iterator, \
+    Sequence, BinaryIO
 
-from github import GitHubRepository
+from database import Database, release_header, file_header
 from models import Release
 
 
-example_repo: str = 'https://github.com/Azure/azure-rest-api-specs-examples'
-csvdb_folder: str = 'csvdb'
-metadata_branch: str = 'metadata'
+snapshot_version: int = 3
 
+# size in bytes of the lines read from CSV file at once
+_chunk_bytes: int = 1 << 20
 
-@dataclasses.dataclass(eq=True)
-class DatabaseInternal:
-    rows: List[List]
-    next_id: int = 1
 
-    def __init__(self, reader: csv.DictReader):
-        next(reader, None)  # skip header row
+class Row:
+    # row with fixed columns, also behaves as a sequence of column values (as the row in CSV)
+    # rows are stored by column in DatabaseInternal, and created on access
+    __slots__ = ()
 
-        self.rows = []
-        for row in reader:
-            self.rows.append(row)
-            self.next_id = max(self.next_id, int(row[0]) + 1)
+    # columns stored as int, e.g. id, instead of str in CSV
+    int_columns: Tuple[str, ...] = ()
+    # columns of values repeated among rows, stored as interned str
+    interned_columns: Tuple[str, ...] = ()
 
-    def append(self, row) -> str:
-        # insert a row, return the id of the row
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [getattr(self, name) for name in self.__slots__[index]]
+        return getattr(self, self.__slots__[index])
 
-        row_id = str(self.next_id)
-        row.insert(0, row_id)
-        self.next_id += 1
-        self.rows.append(row)
-        return row_id
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
 
+    def __len__(self) -> int:
+        return len(self.__slots__)
 
-class CsvDatabase:
-    work_dir: str
-    example_metadata_path: str
-    index_file_path: str
-    list_file_path: str
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Row, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({list(self)})'
+
+
+class ReleaseRow(Row):
+    __slots__ = ('id', 'name', 'language', 'tag', 'package', 'version', 'date_epoch', 'date')
+
+    int_columns = ('id', 'date_epoch')
+    interned_columns = ('language', 'package', 'date')
+
+    def __init__(self, id: int, name: str, language: str, tag: str, package: str, version: str,
+                 date_epoch: int, date: str):
+        self.id = id
+        self.name = name
+        self.language = language
+        self.tag = tag
+        self.package = package
+        self.version = version
+        self.date_epoch = date_epoch
+        self.date = date
 
-    release_db: DatabaseInternal
-    file_db: DatabaseInternal
 
-    branch: str = None
-    date_str: str
+class FileRow(Row):
+    __slots__ = ('id', 'file', 'release_id')
+
+    int_columns = ('id', 'release_id')
+
+    def __init__(self, id: int, file: str, release_id: int):
+        self.id = id
+        self.file = file
+        self.release_id = release_id
+
+
+class DatabaseInternal:
+    # table of rows, stored by column
+    # int column (e.g. id) is an array('q'), its value is int, not the str in CSV; other column is a list of str
+
+    next_id: int = 1
+    key_column: Optional[int]
+    row_type: Type[Row]
+
+    _columns: List[Union[array, List[str]]]
+    # conversion of value from CSV (and of appended value) for each column
+    _converters: List[Optional[Callable[[Any], Any]]]
+    # removed row is kept in columns, until compact
+    _removed_positions: Set[int]
+    # value of key column -> position in columns
+    _index: Dict[str, int]
+
+    # byte offset of each position in CSV file, None if the file is not yet written
+    _offsets: Optional[array]
+    # rows from this position are changed since the file is written
+    _dirty_position: int
+
+    def __init__(self, reader: Iterable[List[Sequence[str]]], row_type: Type[Row], key_column: Optional[int] = None):
+        # reader provides the rows of CSV by chunk, as the values of each column in the chunk
+
+        self.key_column = key_column
+        self.row_type = row_type
+        self._columns = [array('q') if name in row_type.int_columns else [] for name in row_type.__slots__]
+        self._converters = [int if name in row_type.int_columns
+                            else sys.intern if name in row_type.interned_columns
+                            else None
+                            for name in row_type.__slots__]
+        self._removed_positions = set()
+        self._offsets = None
+        self._dirty_position = 0
+
+        for chunk in reader:
+            for column, converter, values in zip(self._columns, self._converters, chunk):
+                column.extend(values if converter is None else map(converter, values))
+
+        self.next_id = max(self.next_id, max(self._columns[0], default=0) + 1)
+        self._index = {} if key_column is None \
+            else {key: position for position, key in enumerate(self._columns[key_column])}
+
+    @property
+    def rows(self) -> List[Row]:
+        rows = map(self.row_type, *self._columns)
+        if self._removed_positions:
+            rows = (row for position, row in enumerate(rows) if position not in self._removed_positions)
+        return list(rows)
+
+    def append(self, values: List) -> Row:
+        # insert a row of column values except id, return the row
+
+        position = self._size()
+        self._dirty_position = min(self._dirty_position, position)
+        row = self.row_type(*self._convert([self.next_id] + list(values)))
+        for column, value in zip(self._columns, row):
+            column.append(value)
+        self.next_id += 1
+        if self.key_column is not None:
+            self._index[row[self.key_column]] = position
+        return row
 
-    def __init__(self, work_dir: str):
-        self.work_dir = work_dir
-        self.example_metadata_path = path.join(self.work_dir, csvdb_folder)
+    def get(self, key: str) -> Optional[Row]:
+        # get row by value of key column
 
-        self.index_file_path = path.join(self.example_metadata_path, 'java-library-example-index.csv')
-        self.list_file_path = path.join(self.example_metadata_path, 'java-library-example-list.csv')
+        position = self._index.get(key)
+        return None if position is None else self._row(position)
 
-    def checkout(self):
-        # checkout metadata branch from azure-rest-api-specs-examples repo
-        cmd = ['git', 'clone',
-               '--quiet',
-               '--depth', '1',
-               '--branch', metadata_branch,
-               example_repo, self.example_metadata_path]
-        logging.info(f'Checking out repository: {example_repo}, branch {metadata_branch}')
-        logging.info('Command line: ' + ' '.join(cmd))
-        subprocess.check_call(cmd, cwd=self.work_dir)
+    def remove(self, key: str) -> bool:
+        # remove row by value of key column, return false if not found
+
+        position = self._index.pop(key, None)
+        if position is None:
+            return False
+        self._removed_positions.add(position)
+        self._dirty_position = min(self._dirty_position, position)
+        return True
+
+    def compact(self):
+        # drop removed rows
+
+        if not self._removed_positions:
+            return
+
+        live_positions = [position for position in range(self._size()) if position not in self._removed_positions]
+        if self._offsets is not None:
+            # offsets are valid until dirty position
+            offsets = array('q', (self._offsets[position] for position in live_positions
+                                  if position < self._dirty_position))
+            offsets.append(self._offsets[self._dirty_position])
+            self._offsets = offsets
+        self._dirty_position = bisect.bisect_left(live_positions, self._dirty_position)
+
+        self._columns = [array('q', (column[position] for position in live_positions)) if isinstance(column, array)
+                         else [column[position] for position in live_positions]
+                         for column in self._columns]
+        self._removed_positions = set()
+        if self.key_column is not None:
+            self._index = {key: position for position, key in enumerate(self._columns[self.key_column])}
+
+    def write(self, file_path: str, header: List[str]):
+        # write header and rows to CSV file
+        # once the file is written, later write only re-writes from the first changed row, result is the same
+
+        if self._offsets is None or not path.isfile(file_path):
+            position = 0
+        elif self._dirty_position < self._size():
+            position = self._dirty_position
+        else:
+            # no change
+            return
+
+        format_row = _row_formatter()
+        with open(file_path, 'wb' if position == 0 else 'r+b') as csv_file:
+            if position == 0:
+                self._offsets = array('q')
+                offset = csv_file.write(format_row(header))
+            else:
+                offset = self._offsets[position]
+                del self._offsets[position:]
+                csv_file.seek(offset)
+                csv_file.truncate()
+
+            rows = zip(*(itertools.islice(column, position, None) for column in self._columns))
+            for row_position, row in enumerate(rows, position):
+                self._offsets.append(offset)
+                if row_position not in self._removed_positions:
+                    offset += csv_file.write(format_row(row))
+            self._offsets.append(offset)
+
+        self._dirty_position = self._size()
+
+    def _row(self, position: int) -> Row:
+        return self.row_type(*(column[position] for column in self._columns))
+
+    def _convert(self, values: Iterable) -> List:
+        return [value if converter is None else converter(value) for converter, value in zip(self._converters, values)]
+
+    def _size(self) -> int:
+        # count of rows, including removed rows
+        return len(self._columns[0])
+
+
+class FileDatabaseInternal(DatabaseInternal):
+    # table whose rows are kept in the CSV file, only the index of key column and the offset of rows are in memory
+    # row is read from the file on access, appended rows are in memory until write
+    # key_column is required
+
+    file_path: str
+    # count of rows in file, including removed rows, position of appended row starts from it
+    _file_size: int
+
+    # _offsets has the byte offset of each row in file, and the end of file
+    # removed row is kept in file until write, and has no bytes after write, until compact
+
+    def __init__(self, file_path: str, row_type: Type[Row], key_column: int):
+        # read the file once, without keeping rows
+
+        super().__init__((), row_type, key_column)
+        self.file_path = file_path
+        self._offsets = array('q')
+        with open(file_path, 'rb') as csv_file:
+            for columns, offsets in _read_csv(csv_file, len(row_type.__slots__)):
+                if not offsets:
+                    continue
+                self._index.update(zip(columns[key_column], itertools.count(len(self._offsets))))
+                self._offsets.extend(offsets)
+                self.next_id = max(self.next_id, max(map(int, columns[0])) + 1)
+            self._offsets.append(csv_file.tell())
+
+            # file not written by csv.writer is re-written at first write, with the same line break as a full write
+            csv_file.seek(0)
+            header_written = csv_file.readline().endswith(b'\r\n')
+        self._file_size = len(self._offsets) - 1
+        self._dirty_position = self._file_size if header_written else 0
+
+    @property
+    def rows(self) -> List[Row]:
+        # all rows are read from the file
+        with open(self.file_path, 'rb') as csv_file:
+            data = csv_file.read()
+        live_positions = [position for position in range(self._file_size) if position not in self._removed_positions]
+        text = b''.join(_line(data[self._offsets[position]:self._offsets[position + 1]])
+                        for position in live_positions).decode(locale.getpreferredencoding(False))
+        rows = [self.row_type(*self._convert(values))
+                for values in csv.reader(io.StringIO(text, newline=''), delimiter=',', quotechar='"',
+                                         quoting=csv.QUOTE_MINIMAL)]
+        rows.extend(row for position, row in enumerate(map(self.row_type, *self._columns), self._file_size)
+                    if position not in self._removed_positions)
+        return rows
+
+    def compact(self):
+        # drop removed rows that are written, their bytes are already removed from file
+
+        dropped_positions = sorted(position for position in self._removed_positions if position < self._dirty_position)
+        if not dropped_positions:
+            return
+
+        dropped = set(dropped_positions)
+        self._offsets = array('q', (offset for position, offset in enumerate(self._offsets)
+                                    if position not in dropped))
+        self._file_size -= len(dropped_positions)
+        self._dirty_position -= len(dropped_positions)
+        self._removed_positions = {position - len(dropped_positions) for position in self._removed_positions
+                                   if position not in dropped}
+        self._index = {key: position - bisect.bisect_left(dropped_positions, position)
+                       for key, position in self._index.items()}
+
+    def write(self, file_path: str, header: List[str]):
+        # re-write the file from the first changed row, unchanged rows are copied as bytes
+
+        position = self._dirty_position
+        if position >= self._size():
+            # no change
+            return
+
+        format_row = _row_formatter()
+        with open(file_path, 'r+b') as csv_file:
+            start_offset = 0 if position == 0 else self._offsets[min(position, self._file_size)]
+            csv_file.seek(start_offset)
+            data = memoryview(csv_file.read(self._offsets[self._file_size] - start_offset))
+            csv_file.seek(start_offset)
+            csv_file.truncate()
+
+            offset = start_offset
+            if position == 0:
+                offset += csv_file.write(format_row(header))
+            for row_position in range(position, self._file_size):
+                row_offset = offset
+                if row_position not in self._removed_positions:
+                    offset += csv_file.write(_line(
+                        data[self._offsets[row_position] - start_offset:self._offsets[row_position + 1] - start_offset]))
+                self._offsets[row_position] = row_offset
+            if position == self._file_size and offset > 0:
+                # last line of file could be without line break
+                csv_file.seek(offset - 1)
+                if csv_file.read(1) != b'\n':
+                    offset += csv_file.write(b'\r\n')
+
+            # appended rows are moved to file
+            del self._offsets[-1]
+            for row_position, row in enumerate(zip(*self._columns), self._file_size):
+                self._offsets.append(offset)
+                if row_position not in self._removed_positions:
+                    offset += csv_file.write(format_row(row))
+            self._offsets.append(offset)
+
+        self._file_size = len(self._offsets) - 1
+        self._columns = [array('q') if isinstance(column, array) else [] for column in self._columns]
+        self._dirty_position = self._file_size
+
+    def _row(self, position: int) -> Row:
+        if position >= self._file_size:
+            return super()._row(position - self._file_size)
+
+        with open(self.file_path, 'rb') as csv_file:
+            csv_file.seek(self._offsets[position])
+            data = csv_file.read(self._offsets[position + 1] - self._offsets[position])
+        text = data.decode(locale.getpreferredencoding(False))
+        values = next(csv.reader(io.StringIO(text, newline=''), delimiter=',', quotechar='"',
+                                 quoting=csv.QUOTE_MINIMAL))
+        return self.row_type(*self._convert(values))
+
+    def _size(self) -> int:
+        return self._file_size + super()._size()
+
+
+class CsvDatabase(Database):
+    # metadata in memory, loaded from the CSV files, and written back incrementally
+
+    release_db: DatabaseInternal
+    # loaded on first use, see file_db
+    _file_db: Optional[DatabaseInternal] = None
+
+    # (name, language) -> id of release
+    release_index: Dict[Tuple[str, str], int]
+    # language -> rows of release
+    language_index: Dict[str, List[ReleaseRow]]
+    # language -> tags of release
+    tag_index: Dict[str, Set[str]]
+
+    # folder of the snapshot of loaded database, outside of the metadata repository
+    snapshot_dir: Optional[str]
+    # key of the snapshot for the CSV files at load, None if snapshot is not applicable
+    snapshot_key: Optional[Tuple] = None
+
+    def __init__(self, work_dir: str, snapshot_dir: Optional[str] = None, journal_path: Optional[str] = None,
+                 commit_batch_size: int = 1):
+        super().__init__(work_dir, journal_path, commit_batch_size)
+        self.snapshot_dir = snapshot_dir
 
     def load(self):
-        with open(self.index_file_path, 'r', newline='') as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            self.release_db = DatabaseInternal(csv_reader)
+        self.snapshot_key = self._get_snapshot_key()
+        self.release_db = self._load_table(self.index_file_path, lambda: _read_table(self.index_file_path, ReleaseRow))
+        # file list is loaded on first use
+        self._file_db = None
+
+        self.release_index = {}
+        self.language_index = {}
+        self.tag_index = {}
+        for row in self.release_db.rows:
+            self._index_release(row)
+
+        self._replay_journal()
 
-        with open(self.list_file_path, 'r', newline='') as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            self.file_db = DatabaseInternal(csv_reader)
+    @property
+    def file_db(self) -> DatabaseInternal:
+        # file list is only required when a release is added, so that a run without new release does not load it
+        # rows of file list are kept in file, see FileDatabaseInternal
+        if self._file_db is None:
+            # column 'file' is unique
+            self._file_db = self._load_table(self.list_file_path,
+                                             lambda: FileDatabaseInternal(self.list_file_path, FileRow, key_column=1))
+        return self._file_db
 
     def dump(self):
-        with open(self.index_file_path, 'w', newline='') as csv_file:
-            csv_writer = csv.writer(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            csv_writer.writerow(['id', 'name', 'language', 'tag', 'package', 'version', 'date_epoch', 'date'])
-            for row in self.release_db.rows:
-                csv_writer.writerow(row)
-
-        with open(self.list_file_path, 'w', newline='') as csv_file:
-            csv_writer = csv.writer(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            csv_writer.writerow(['id', 'file', 'release_id'])
-            for row in self.file_db.rows:
-                csv_writer.writerow(row)
-
-    def commit(self, tag):
-        if not self.branch:
-            # git checkout new branch
-            self.date_str = datetime.now().strftime('%Y-%m-%d')
-            self.branch = f'automation-metadata-{self.date_str}'
-            cmd = ['git', 'checkout', '-b', self.branch]
-            logging.info('Command line: ' + ' '.join(cmd))
-            subprocess.check_call(cmd, cwd=self.example_metadata_path)
-
-        # git add
-        cmd = ['git', 'add', 'java-library-example-index.csv']
-        logging.info('Command line: ' + ' '.join(cmd))
-        subprocess.check_call(cmd, cwd=self.example_metadata_path)
-
-        cmd = ['git', 'add', 'java-library-example-list.csv']
-        logging.info('Command line: ' + ' '.join(cmd))
-        subprocess.check_call(cmd, cwd=self.example_metadata_path)
-
-        # git commit
-        title = f'[Automation] Update metadata on {tag}'
-        logging.info(f'git commit: {title}')
-        cmd = ['git',
-               '-c', 'user.name=azure-sdk',
-               '-c', 'user.email=azuresdk@microsoft.com',
-               'commit', '-m', title]
-        logging.info('Command line: ' + ' '.join(cmd))
-        subprocess.check_call(cmd, cwd=self.example_metadata_path)
+        # rows are appended, or re-written from the first replaced file, to keep the files identical to a full dump
+        self.release_db.write(self.index_file_path, release_header)
+        if self._file_db is not None:
+            self._file_db.write(self.list_file_path, file_header)
+
+    def compact(self):
+        # drop rows of replaced files
+        self.release_db.compact()
+        if self._file_db is not None:
+            self._file_db.compact()
 
     def push(self, github_token: str):
-        if self.branch:
-            title = f'[Automation] Update metadata on {self.date_str}'
-            # git push
-            remote_uri = 'https://' + github_token + '@' + example_repo[len('https://'):]
-            cmd = ['git', 'push', remote_uri, self.branch]
-            # do not print this as it contains token
-            # logging.info('Command line: ' + ' '.join(cmd))
-            subprocess.check_call(cmd, cwd=self.example_metadata_path)
-
-            # create github pull request
-            owner = _repository_owner(example_repo)
-            name = _repository_name(example_repo)
-            head = f'{owner}:{self.branch}'
-            repo = GitHubRepository(owner, name, github_token)
-            pull_number = repo.create_pull_request(title, head, metadata_branch)
-            repo.add_label(pull_number, ['auto-merge'])
-            logging.info(f'succeeded, pull number {pull_number}')
-
-    def new_release(self, name: str, language: str, tag: str, package: str, version: str, date: datetime,
-                    files: List[str]) -> bool:
-        # add a new release and all the example files
-        # return false, if release already exists in DB
+        # drop rows of replaced files after the last commit, then push
+        self.flush()
+        self.compact()
+        super().push(github_token)
 
+    def _new_release(self, name: str, language: str, tag: str, package: str, version: str, date: datetime,
+                     files: List[str]) -> bool:
         release_id = self._query_release(name, language)
         if release_id:
             logging.warning(f'Release already exists for {language}#{name}')
@@ -151,12 +427,14 @@ class CsvDatabase:
         date_epoch = int(date.timestamp())
         date_str = datetime.fromtimestamp(date_epoch).strftime('%m/%d/%Y')
 
-        release_id = self.release_db.append([name, language, tag, package, version, date_epoch, date_str])
+        row = self.release_db.append([name, language, tag, package, version, date_epoch, date_str])
+        self._index_release(row)
 
         # remove 'file' that already in DB -- maintain column 'file' be unique
-        self.file_db.rows = [row for row in self.file_db.rows if row[1] not in files]
         for file in files:
-            self.file_db.append([file, release_id])
+            self.file_db.remove(file)
+        for file in files:
+            self.file_db.append([file, row.id])
 
         return True
 
@@ -164,22 +442,157 @@ class CsvDatabase:
         # query processed releases
 
         releases = []
-        for row in self.release_db.rows:
-            if language == row[2]:
-                date = datetime.fromtimestamp(int(row[6]))
-                releases.append(Release(row[3], row[4], row[5], date))
+        for row in self.language_index.get(language, []):
+            date = datetime.fromtimestamp(row.date_epoch)
+            releases.append(Release(row.tag, row.package, row.version, date))
         return releases
 
-    def _query_release(self, name: str, language: str) -> Union[str, None]:
-        for row in self.release_db.rows:
-            if name == row[1] and language == row[2]:
-                return row[0]
-        return None
-
-
-def _repository_owner(repository: str) -> str:
-    return re.match(r'https://github.com/([^/:]+)/.*', repository).group(1)
-
-
-def _repository_name(repository: str) -> str:
-    return re.match(r'https://github.com/[^/:]+/(.*)', repository).group(1)
+    def query_release_tags(self, language: str) -> FrozenSet[str]:
+        # query tags of processed releases, from the set maintained by new_release
+
+        return frozenset(self.tag_index.get(language, ()))
+
+    def _query_release(self, name: str, language: str) -> Union[int, None]:
+        return self.release_index.get((name, language))
+
+    def _index_release(self, row: ReleaseRow):
+        self.release_index.setdefault((row.name, row.language), row.id)
+        self.language_index.setdefault(row.language, []).append(row)
+        self.tag_index.setdefault(row.language, set()).add(row.tag)
+
+    def _load_table(self, file_path: str, read_table: Callable[[], DatabaseInternal]) -> DatabaseInternal:
+        table = self._load_snapshot(file_path)
+        if table is None:
+            table = read_table()
+            self._save_snapshot(file_path, table)
+        return table
+
+    def _get_snapshot_key(self) -> Optional[Tuple]:
+        # snapshot is valid for the commit of metadata repository, and the size of CSV files
+        # None, if snapshot is not applicable
+
+        if not self.snapshot_dir:
+            return None
+        try:
+            cmd = ['git', 'rev-parse', 'HEAD']
+            output = subprocess.check_output(cmd, cwd=self.example_metadata_path, stderr=subprocess.DEVNULL)
+        except (subprocess.CalledProcessError, OSError):
+            return None
+        return (snapshot_version, str(output, 'utf-8').strip(),
+                path.getsize(self.index_file_path), path.getsize(self.list_file_path))
+
+    def _snapshot_path(self, file_path: str) -> str:
+        return path.join(self.snapshot_dir, path.splitext(path.basename(file_path))[0] + '.pickle')
+
+    def _load_snapshot(self, file_path: str) -> Optional[DatabaseInternal]:
+        if not self.snapshot_key:
+            return None
+        snapshot_path = self._snapshot_path(file_path)
+        if not path.isfile(snapshot_path):
+            return None
+
+        try:
+            with open(snapshot_path, 'rb') as f_in:
+                snapshot = pickle.load(f_in)
+        except Exception as e:
+            logging.warning(f'Invalid snapshot: {snapshot_path}, {e}')
+            return None
+        if snapshot['key'] != self.snapshot_key:
+            return None
+
+        logging.info(f'Load database from snapshot: {snapshot_path}')
+        return snapshot['table']
+
+    def _save_snapshot(self, file_path: str, table: DatabaseInternal):
+        if self.snapshot_key:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            snapshot_path = self._snapshot_path(file_path)
+            # table is pickled by column, as arrays and lists, rows are created on access after load
+            snapshot = {
+                'key': self.snapshot_key,
+                'table': table
+            }
+            # write to temporary file then replace, so that a concurrent reader never sees partial file
+            tmp_snapshot_path = f'{snapshot_path}.{os.getpid()}.tmp'
+            with open(tmp_snapshot_path, 'wb') as f_out:
+                pickle.dump(snapshot, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_snapshot_path, snapshot_path)
+
+
+def _read_table(file_path: str, row_type: Type[Row]) -> DatabaseInternal:
+    with open(file_path, 'rb') as csv_file:
+        return DatabaseInternal((columns for columns, _ in _read_csv(csv_file, len(row_type.__slots__))), row_type)
+
+
+def _row_formatter() -> Callable[[Iterable], bytes]:
+    # format a row as a line of CSV, in the encoding of CSV file
+    encoding = locale.getpreferredencoding(False)
+    buffer = io.StringIO()
+    csv_writer = csv.writer(buffer, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+    def format_row(row: Iterable) -> bytes:
+        buffer.seek(0)
+        buffer.truncate()
+        csv_writer.writerow(row)
+        return buffer.getvalue().encode(encoding)
+
+    return format_row
+
+
+def _line(data: Union[bytes, memoryview]) -> Union[bytes, memoryview]:
+    # bytes of a row in file, with line break as written by csv.writer
+    if not len(data) or data[-2:] == b'\r\n':
+        return data
+    if data[-1:] == b'\n':
+        return bytes(data[:-1]) + b'\r\n'
+    # last line of file without line break
+    return bytes(data) + b'\r\n'
+
+
+def _read_csv(csv_file: BinaryIO, column_count: int) -> Iterator[Tuple[List[Sequence[str]], List[int]]]:
+    # rows of CSV file after header, by chunk, as the values of each column in the chunk, and the byte offset of rows
+    # lines of a chunk are split at once, which is much faster than csv.reader that creates a list for each row
+    # chunk with quote (or blank line) is parsed by csv.reader
+
+    encoding = locale.getpreferredencoding(False)
+    offset = len(csv_file.readline())  # skip header row
+    while True:
+        lines = csv_file.readlines(_chunk_bytes)
+        if not lines:
+            return
+
+        data = b''.join(lines)
+        if b'"' not in data:
+            text = data.decode(encoding)
+            values = text.replace('\r\n', '\n').replace('\n', ',').split(',')
+            if not text.endswith('\n'):
+                # last line without line break
+                values.append('')
+            values.pop()
+            if len(values) == column_count * len(lines):
+                yield ([values[column::column_count] for column in range(column_count)],
+                       list(itertools.accumulate(map(len, lines[:-1]), initial=offset)))
+                offset += len(data)
+                continue
+
+        # value with line break is quoted, a row continues to next line while the count of quote is odd
+        records = []
+        offsets = []
+        record = b''
+        for line in itertools.chain(lines, iter(lambda: csv_file.readline() if record.count(b'"') % 2 else b'', b'')):
+            record += line
+            if record.count(b'"') % 2 == 0:
+                if record.strip():
+                    records.append(record)
+                    offsets.append(offset)
+                offset += len(record)
+                record = b''
+        if record:
+            # unmatched quote at end of file
+            records.append(record)
+            offsets.append(offset)
+            offset += len(record)
+
+        text = b''.join(records).decode(encoding)
+        rows = csv.reader(io.StringIO(text, newline=''), delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        yield [list(values) for values in zip(*rows)], offsets
@@ -0,0 +1,240 @@
+import os
+from os import path
+import re
+import abc
+import json
+import logging
+import subprocess
+from datetime import datetime
+from typing import List, FrozenSet, Optional, Union
+
+from github import GitHubRepository
+from models import Release
+
+
+example_repo: str = 'https://github.com/Azure/azure-rest-api-specs-examples'
+csvdb_folder: str = 'csvdb'
+metadata_branch: str = 'metadata'
+
+release_header: List[str] = ['id', 'name', 'language', 'tag', 'package', 'version', 'date_epoch', 'date']
+file_header: List[str] = ['id', 'file', 'release_id']
+
+
+class Database(abc.ABC):
+    # metadata of processed releases and their example files
+    # the CSV files in metadata branch of azure-rest-api-specs-examples repo are the source of truth,
+    # storage loads from them, and dumps back to them in the same schema
+    # checkout, journal, commit and push of the CSV files are common to all storages
+
+    work_dir: str
+    example_metadata_path: str
+    index_file_path: str
+    list_file_path: str
+
+    # releases not yet pushed are recorded in journal, and replayed at load
+    journal_path: Optional[str]
+    # commit every N releases, 0 to commit only at push
+    commit_batch_size: int
+    # tags of releases not yet committed
+    pending_tags: List[str]
+
+    branch: str = None
+    date_str: str
+
+    def __init__(self, work_dir: str, journal_path: Optional[str] = None, commit_batch_size: int = 1):
+        self.work_dir = work_dir
+        self.journal_path = journal_path
+        self.commit_batch_size = commit_batch_size
+        self.pending_tags = []
+        self.example_metadata_path = path.join(self.work_dir, csvdb_folder)
+
+        self.index_file_path = path.join(self.example_metadata_path, 'java-library-example-index.csv')
+        self.list_file_path = path.join(self.example_metadata_path, 'java-library-example-list.csv')
+
+    @abc.abstractmethod
+    def load(self):
+        # load from the CSV files, then replay journal
+        pass
+
+    @abc.abstractmethod
+    def dump(self):
+        # write to the CSV files
+        pass
+
+    @abc.abstractmethod
+    def query_releases(self, language: str) -> List[Release]:
+        # query processed releases
+        pass
+
+    @abc.abstractmethod
+    def query_release_tags(self, language: str) -> FrozenSet[str]:
+        # query tags of processed releases
+        pass
+
+    @abc.abstractmethod
+    def _new_release(self, name: str, language: str, tag: str, package: str, version: str, date: datetime,
+                     files: List[str]) -> bool:
+        # add release and files to storage, return false if release already exists
+        pass
+
+    @abc.abstractmethod
+    def _query_release(self, name: str, language: str) -> Union[int, None]:
+        pass
+
+    def checkout(self):
+        # checkout metadata branch from azure-rest-api-specs-examples repo
+        # only the CSV files are fetched and checked out, the clone is reused by later run
+
+        if path.isdir(path.join(self.example_metadata_path, '.git')):
+            logging.info(f'Updating repository: {example_repo}, branch {metadata_branch}')
+            cmd = ['git', 'fetch',
+                   '--quiet',
+                   '--depth', '1',
+                   '--filter=blob:none',
+                   'origin', f'+refs/heads/{metadata_branch}:refs/remotes/origin/{metadata_branch}']
+            logging.info('Command line: ' + ' '.join(cmd))
+            subprocess.check_call(cmd, cwd=self.example_metadata_path)
+        else:
+            logging.info(f'Checking out repository: {example_repo}, branch {metadata_branch}')
+            cmd = ['git', 'clone',
+                   '--quiet',
+                   '--depth', '1',
+                   '--filter=blob:none',
+                   '--no-checkout',
+                   '--branch', metadata_branch,
+                   example_repo, self.example_metadata_path]
+            logging.info('Command line: ' + ' '.join(cmd))
+            subprocess.check_call(cmd, cwd=self.work_dir)
+
+            cmd = ['git', 'sparse-checkout', 'set', '--no-cone',
+                   f'/{path.basename(self.index_file_path)}', f'/{path.basename(self.list_file_path)}']
+            logging.info('Command line: ' + ' '.join(cmd))
+            subprocess.check_call(cmd, cwd=self.example_metadata_path)
+
+        # reset to the metadata branch, discard branch and changes of previous run
+        cmd = ['git', 'checkout', '--quiet', '--force', '-B', metadata_branch, f'refs/remotes/origin/{metadata_branch}']
+        logging.info('Command line: ' + ' '.join(cmd))
+        subprocess.check_call(cmd, cwd=self.example_metadata_path)
+
+    def commit(self, tag):
+        # commit is deferred until there are commit_batch_size pending releases
+        self.pending_tags.append(tag)
+        if 0 < self.commit_batch_size <= len(self.pending_tags):
+            self.flush()
+
+    def flush(self):
+        # dump and commit all pending releases
+        if not self.pending_tags:
+            return
+
+        self.dump()
+
+        if not self.branch:
+            # git checkout new branch
+            self.date_str = datetime.now().strftime('%Y-%m-%d')
+            self.branch = f'automation-metadata-{self.date_str}'
+            cmd = ['git', 'checkout', '-B', self.branch]
+            logging.info('Command line: ' + ' '.join(cmd))
+            subprocess.check_call(cmd, cwd=self.example_metadata_path)
+
+        # git add
+        cmd = ['git', 'add', 'java-library-example-index.csv']
+        logging.info('Command line: ' + ' '.join(cmd))
+        subprocess.check_call(cmd, cwd=self.example_metadata_path)
+
+        cmd = ['git', 'add', 'java-library-example-list.csv']
+        logging.info('Command line: ' + ' '.join(cmd))
+        subprocess.check_call(cmd, cwd=self.example_metadata_path)
+
+        # git commit
+        if len(self.pending_tags) == 1:
+            title = f'[Automation] Update metadata on {self.pending_tags[0]}'
+        else:
+            title = f'[Automation] Update metadata on {len(self.pending_tags)} releases'
+        message = '\n'.join(self.pending_tags)
+        logging.info(f'git commit: {title}')
+        cmd = ['git',
+               '-c', 'user.name=azure-sdk',
+               '-c', 'user.email=azuresdk@microsoft.com',
+               'commit', '-m', title, '-m', message]
+        logging.info('Command line: ' + ' '.join(cmd))
+        subprocess.check_call(cmd, cwd=self.example_metadata_path)
+
+        self.pending_tags = []
+
+    def push(self, github_token: str):
+        self.flush()
+
+        if self.branch:
+            title = f'[Automation] Update metadata on {self.date_str}'
+            # git push
+            remote_uri = 'https://' + github_token + '@' + example_repo[len('https://'):]
+            cmd = ['git', 'push', remote_uri, self.branch]
+            # do not print this as it contains token
+            # logging.info('Command line: ' + ' '.join(cmd))
+            subprocess.check_call(cmd, cwd=self.example_metadata_path)
+
+            # create github pull request
+            owner = _repository_owner(example_repo)
+            name = _repository_name(example_repo)
+            head = f'{owner}:{self.branch}'
+            repo = GitHubRepository(owner, name, github_token)
+            pull_number = repo.create_pull_request(title, head, metadata_branch)
+            repo.add_label(pull_number, ['auto-merge'])
+            logging.info(f'succeeded, pull number {pull_number}')
+
+        # releases in journal are pushed
+        if self.journal_path and path.isfile(self.journal_path):
+            os.remove(self.journal_path)
+
+    def new_release(self, name: str, language: str, tag: str, package: str, version: str, date: datetime,
+                    files: List[str]) -> bool:
+        # add a new release and all the example files
+        # return false, if release already exists in DB
+
+        if not self._new_release(name, language, tag, package, version, date, files):
+            return False
+
+        if self.journal_path:
+            os.makedirs(path.dirname(self.journal_path), exist_ok=True)
+            record = {
+                'name': name,
+                'language': language,
+                'tag': tag,
+                'package': package,
+                'version': version,
+                'date_epoch': int(date.timestamp()),
+                'files': files
+            }
+            with open(self.journal_path, 'a', encoding='utf-8') as f_out:
+                f_out.write(json.dumps(record) + '\n')
+                f_out.flush()
+                os.fsync(f_out.fileno())
+        return True
+
+    def _replay_journal(self):
+        # apply releases recorded by previous run that failed before push, they are committed with next commit
+        if not self.journal_path or not path.isfile(self.journal_path):
+            return
+
+        with open(self.journal_path, 'r', encoding='utf-8') as f_in:
+            for line in f_in:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # incomplete record at crash
+                    logging.warning(f'Invalid record in journal: {line}')
+                    continue
+                if self._new_release(record['name'], record['language'], record['tag'], record['package'],
+                                     record['version'], datetime.fromtimestamp(record['date_epoch']),
+                                     record['files']):
+                    logging.info(f'Replay release from journal: {record["name"]}')
+                    self.pending_tags.append(record['name'])
+
+
+def _repository_owner(repository: str) -> str:
+    return re.match(r'https://github.com/([^/:]+)/.*', repository).group(1)
+
+
+def _repository_name(repository: str) -> str:
+    return re.match(r'https://github.com/[^/:]+/(.*)', repository).group(1)
@@ -1,18 +1,59 @@
+import os
+from os import path
+import json
+import time
+import itertools
+import hashlib
+import threading
+import dataclasses
 import requests
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable
+
+
+@dataclasses.dataclass(eq=True)
+class RateLimitStatus:
+    # rate limit reported by latest response, and accounting of requests in this process
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_epoch: Optional[int] = None
+    request_count: int = 0
+    retry_count: int = 0
+
+
+# connection pool shared by all GitHubRepository, with keep-alive
+_session: requests.Session = requests.Session()
+_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+_rate_limit_status: RateLimitStatus = RateLimitStatus()
+_rate_limit_status_lock: threading.Lock = threading.Lock()
+
+
+def get_rate_limit_status() -> RateLimitStatus:
+    with _rate_limit_status_lock:
+        return dataclasses.replace(_rate_limit_status)
 
 
 class GitHubRepository:
     api_host: str = 'https://api.github.com'
+    max_retries: int = 5
+    max_merge_retries: int = 3
+    backoff_secs: float = 2
+    max_retry_delay_secs: float = 15 * 60
+    retry_statuses: Iterable[int] = (429, 500, 502, 503, 504)
+    # request of other methods, e.g. POST, could be processed even if it failed, it is only retried on rate limit
+    idempotent_methods: Iterable[str] = ('GET', 'HEAD', 'PUT', 'PATCH', 'DELETE')
     owner: str
     name: str
     token: str
+    cache_dir: Optional[str]
 
-    def __init__(self, owner: str, name: str, token):
+    def __init__(self, owner: str, name: str, token, cache_dir: Optional[str] = None):
         self.owner = owner
         self.name = name
         self.token = token
+        # if provided, responses of list_releases are cached on disk, and revalidated by ETag
+        self.cache_dir = cache_dir
 
     def create_pull_request(self, title: str, head: str, base: str) -> int:
         logging.info(f'Create pull request: {head}')
@@ -23,7 +64,7 @@ class GitHubRepository:
             'head': head,
             'base': base
         }
-        pull_request_response = requests.post(request_uri,
+        pull_request_response = self._request('POST', request_uri,
                                               json=request_body,
                                               headers=self._headers())
         if pull_request_response.status_code == 201:
@@ -36,15 +77,23 @@ class GitHubRepository:
     def list_pull_requests(self) -> List[Dict[str, Any]]:
         logging.info(f'List pull requests')
 
-        request_uri = f'{self.api_host}/repos/{self.owner}/{self.name}/pulls?per_page=100'
-        pull_request_response = requests.get(request_uri,
-                                             headers=self._headers())
-        if pull_request_response.status_code == 200:
-            logging.info('Pull request created')
-            return pull_request_response.json()
-        else:
-            logging.error(f'Request failed: {pull_request_response.status_code}\n{pull_request_response.json()}')
-            return []
+        per_page = 100
+        pull_requests = []
+        request_uri = f'{self.api_host}/repos/{self.owner}/{self.name}/pulls'
+        for page in itertools.count(start=1):
+            pull_request_response = self._request('GET', request_uri,
+                                                  params={'per_page': per_page, 'page': page},
+                                                  headers=self._headers())
+            if pull_request_response.status_code == 200:
+                pull_requests_in_page = pull_request_response.json()
+                pull_requests.extend(pull_requests_in_page)
+                if len(pull_requests_in_page) < per_page:
+                    break
+            else:
+                logging.error(f'Request failed: {pull_request_response.status_code}\n{pull_request_response.json()}')
+                break
+        logging.info(f'Count of pull requests: {len(pull_requests)}')
+        return pull_requests
 
     def merge_pull_request(self, pull_request: Dict):
         title = pull_request['title']
@@ -57,9 +106,12 @@ class GitHubRepository:
             'commit_title': title,
             'merge_method': 'squash'
         }
-        merge_response = requests.put(request_uri,
-                                      json=request_body,
-                                      headers=self._headers())
+        # 405 or 409 when base or head branch is modified by another merge, retry a few times
+        merge_response = self._request('PUT', request_uri,
+                                       retry_statuses=tuple(self.retry_statuses) + (405, 409),
+                                       max_retries=self.max_merge_retries,
+                                       json=request_body,
+                                       headers=self._headers())
         if merge_response.status_code == 200:
             logging.info('Pull request merged')
         else:
@@ -68,10 +120,22 @@ class GitHubRepository:
 
     def list_releases(self, per_page: int, page: int = 1) -> List[Dict[str, Any]]:
         request_uri = f'{self.api_host}/repos/{self.owner}/{self.name}/releases'
-        releases_response = requests.get(request_uri,
-                                         params={'per_page': per_page, 'page': page},
-                                         headers=self._headers())
-        if releases_response.status_code == 200:
+        params = {'per_page': per_page, 'page': page}
+
+        headers = self._headers()
+        cached_response = self._load_cached_response(request_uri, params)
+        if cached_response:
+            headers['If-None-Match'] = cached_response['etag']
+
+        releases_response = self._request('GET', request_uri,
+                                          params=params,
+                                          headers=headers)
+        if releases_response.status_code == 304:
+            return cached_response['body']
+        elif releases_response.status_code == 200:
+            if 'ETag' in releases_response.headers:
+                self._save_cached_response(request_uri, params,
+                                           releases_response.headers['ETag'], releases_response.json())
             return releases_response.json()
         else:
             logging.error(f'Request failed: {releases_response.status_code}\n{releases_response.json()}')
@@ -82,7 +146,7 @@ class GitHubRepository:
         request_body = {
             'labels': labels
         }
-        add_label_response = requests.post(request_uri,
+        add_label_response = self._request('POST', request_uri,
                                            json=request_body,
                                            headers=self._headers())
         if add_label_response.status_code == 200:
@@ -91,6 +155,87 @@ class GitHubRepository:
             logging.error(f'Request failed: {add_label_response.status_code}\n{add_label_response.json()}')
             add_label_response.raise_for_status()
 
+    def _cached_response_path(self, request_uri: str, params: Dict[str, Any]) -> str:
+        key = request_uri + '?' + '&'.join(f'{k}={v}' for k, v in sorted(params.items()))
+        return path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _load_cached_response(self, request_uri: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.cache_dir:
+            cache_path = self._cached_response_path(request_uri, params)
+            if path.isfile(cache_path):
+                try:
+                    with open(cache_path, 'r', encoding='utf-8') as f_in:
+                        return json.load(f_in)
+                except ValueError:
+                    logging.warning(f'Invalid cached response: {cache_path}')
+        return None
+
+    def _save_cached_response(self, request_uri: str, params: Dict[str, Any], etag: str, body: Any):
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache_path = self._cached_response_path(request_uri, params)
+            # write to temporary file then replace, so that a concurrent reader never sees partial file
+            tmp_cache_path = f'{cache_path}.{os.getpid()}.tmp'
+            with open(tmp_cache_path, 'w', encoding='utf-8') as f_out:
+                json.dump({'etag': etag, 'body': body}, f_out)
+            os.replace(tmp_cache_path, cache_path)
+
+    def _request(self, method: str, request_uri: str, retry_statuses: Iterable[int] = None,
+                 max_retries: int = None, **kwargs) -> requests.Response:
+        # send request via shared session, retry on server error and rate limit, with exponential backoff
+
+        retry_statuses = retry_statuses or self.retry_statuses
+        max_retries = self.max_retries if max_retries is None else max_retries
+        idempotent = method.upper() in self.idempotent_methods
+        attempt = 0
+        while True:
+            try:
+                response = _session.request(method, request_uri, **kwargs)
+            except requests.ConnectionError as e:
+                if not idempotent or attempt >= max_retries:
+                    raise
+                delay = self.backoff_secs * (2 ** attempt)
+                logging.warning(f'Request error: {e}, retry in {delay} seconds')
+            else:
+                self._update_rate_limit_status(response)
+                rate_limited = response.status_code == 429 \
+                    or (response.status_code == 403 and self._is_rate_limited(response))
+                retryable = rate_limited or (idempotent and response.status_code in retry_statuses)
+                if not retryable or attempt >= max_retries:
+                    return response
+                delay = self._retry_delay(response, attempt)
+                logging.warning(f'Request failed: {response.status_code}, retry in {delay} seconds')
+
+            attempt += 1
+            with _rate_limit_status_lock:
+                _rate_limit_status.retry_count += 1
+            time.sleep(delay)
+
+    def _retry_delay(self, response: requests.Response, attempt: int) -> float:
+        if 'Retry-After' in response.headers:
+            delay = float(response.headers['Retry-After'])
+        elif response.headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset' in response.headers:
+            delay = float(response.headers['X-RateLimit-Reset']) - time.time() + 1
+        else:
+            delay = self.backoff_secs * (2 ** attempt)
+        return min(max(delay, 0), self.max_retry_delay_secs)
+
+    @staticmethod
+    def _is_rate_limited(response: requests.Response) -> bool:
+        # primary rate limit, or secondary rate limit
+        return response.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in response.headers
+
+    @staticmethod
+    def _update_rate_limit_status(response: requests.Response):
+        with _rate_limit_status_lock:
+            _rate_limit_status.request_count += 1
+            if 'X-RateLimit-Limit' in response.headers:
+                _rate_limit_status.limit = int(response.headers['X-RateLimit-Limit'])
+            if 'X-RateLimit-Remaining' in response.headers:
+                _rate_limit_status.remaining = int(response.headers['X-RateLimit-Remaining'])
+            if 'X-RateLimit-Reset' in response.headers:
+                _rate_limit_status.reset_epoch = int(response.headers['X-RateLimit-Reset'])
+
     def _headers(self) -> Dict[str, str]:
         return {
             'X-GitHub-Api-Version': '2022-11-28',
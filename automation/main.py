@@ -10,16 +10,26 @@ import json
 import argparse
 import logging
 import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import FrozenSet
 
 from models import *
-from github import GitHubRepository
+from github import GitHubRepository, get_rate_limit_status
+from database import Database
 from csv_database import CsvDatabase
+from sqlite_database import SqliteDatabase
+from repository_cache import RepositoryCache
+from worker import run_worker_script, run_worker_in_process
 
 
 github_token: str
 root_path: str = '.'
 
-csv_database: CsvDatabase
+csv_database: Database
+csv_database_lock: threading.Lock = threading.Lock()
+
+repository_cache: RepositoryCache
 
 start_time_secs: float
 
@@ -30,6 +40,21 @@ tmp_folder: str = 'tmp'
 tmp_spec_folder: str = 'spec'
 tmp_example_folder: str = 'example'
 tmp_sdk_folder: str = 'sdk'
+tmp_cache_folder: str = 'cache'
+tmp_github_cache_folder: str = 'github'
+tmp_csvdb_cache_folder: str = 'csvdb'
+tmp_worker_cache_folder: str = 'worker'
+tmp_sqlite_database_file: str = 'csvdb.sqlite'
+csvdb_journal_file: str = 'journal.jsonl'
+
+examples_branch: str = 'main'
+
+merge_max_workers: int = 4
+
+spec_repo: str = 'https://github.com/Azure/azure-rest-api-specs'
+spec_repo_branch: str = 'main'
+spec_repo_prepared: bool = False
+spec_repo_lock: threading.Lock = threading.Lock()
 
 
 def load_configuration(command_line: CommandLineConfiguration) -> Configuration:
@@ -41,19 +66,25 @@ def load_configuration(command_line: CommandLineConfiguration) -> Configuration:
                                                      command_line.build_id,
                                                      command_line.skip_processed,
                                                      command_line.persist_data,
-                                                     now - timedelta(days=command_line.release_in_days), now)
+                                                     now - timedelta(days=command_line.release_in_days), now,
+                                                     command_line.max_workers)
 
     sdk_configurations = []
     for sdk_config in config['sdkConfigurations']:
-        script = Script(sdk_config['script']['run'])
+        script = Script(sdk_config['script']['run'],
+                        sdk_config['script']['module'] if 'module' in sdk_config['script'] else None)
         release_tag = ReleaseTagConfiguration(sdk_config['releaseTag']['regexMatch'],
                                               sdk_config['releaseTag']['packageRegexGroup'],
                                               sdk_config['releaseTag']['versionRegexGroup'])
         ignored_packages = sdk_config['ignoredPackages'] if 'ignoredPackages' in sdk_config else []
+        max_workers = sdk_config['maxWorkers'] if 'maxWorkers' in sdk_config else None
+        sparse_checkout_paths = sdk_config['sparseCheckoutPaths'] if 'sparseCheckoutPaths' in sdk_config else []
+        requires_specs = sdk_config['requiresSpecs'] if 'requiresSpecs' in sdk_config else False
         sdk_configuration = SdkConfiguration(sdk_config['name'],
                                              sdk_config['language'],
                                              sdk_config['repository'],
-                                             release_tag, script, ignored_packages)
+                                             release_tag, script, ignored_packages, max_workers,
+                                             sparse_checkout_paths, requires_specs)
         sdk_configurations.append(sdk_configuration)
 
     return Configuration(operation_configuration, sdk_configurations)
@@ -64,15 +95,27 @@ def merge_pull_requests(operation: OperationConfiguration):
 
     repo = GitHubRepository(operation.repository_owner, operation.repository_name, github_token)
 
-    pull_requests = repo.list_pull_requests()
-    for pull_request in pull_requests:
-        title = pull_request['title']
-        if title.startswith('[Automation]'):
-            if 'labels' in pull_request and any(label['name'] == 'auto-merge' for label in pull_request['labels']):
-                repo.merge_pull_request(pull_request)
+    pull_requests = [pull_request for pull_request in repo.list_pull_requests()
+                     if pull_request['title'].startswith('[Automation]')
+                     and 'labels' in pull_request
+                     and any(label['name'] == 'auto-merge' for label in pull_request['labels'])]
+
+    # merges run in parallel, conflict from concurrent merge is retried by GitHubRepository
+    start = time.perf_counter()
+    merged_count = 0
+    with ThreadPoolExecutor(max_workers=merge_max_workers, thread_name_prefix='merge') as executor:
+        futures = [executor.submit(repo.merge_pull_request, pull_request) for pull_request in pull_requests]
+        for pull_request, future in zip(pull_requests, futures):
+            try:
+                future.result()
+                merged_count += 1
+            except Exception as e:
+                logging.error(f'Failed to merge pull request {pull_request["number"]}: {e}')
+    end = time.perf_counter()
 
-                # wait a few seconds to avoid 409
-                time.sleep(5)
+    elapsed = timedelta(seconds=end - start)
+    logging.info(f'Merged {merged_count} of {len(pull_requests)} pull requests in {str(elapsed)}, '
+                 f'{merged_count / max(elapsed.total_seconds(), 1) * 60:.1f} per minute')
 
 
 def process_release(operation: OperationConfiguration, sdk: SdkConfiguration, release: Release,
@@ -85,67 +128,46 @@ def process_release(operation: OperationConfiguration, sdk: SdkConfiguration, re
     os.makedirs(tmp_root_path, exist_ok=True)
     tmp_path = tempfile.mkdtemp(prefix='tmp', dir=tmp_root_path)
     logging.info(f'Work directory: {tmp_path}')
+    example_repo_path = path.join(tmp_path, tmp_example_folder)
+    sdk_repo_path = path.join(tmp_path, tmp_sdk_folder)
+    branch = f'automation-examples_{sdk.name}_{release.tag}_{operation.build_id}'
     try:
-        example_repo_path = path.join(tmp_path, tmp_example_folder)
-        sdk_repo_path = path.join(tmp_path, tmp_sdk_folder)
         spec_repo_path = path.join(tmp_root_path, tmp_spec_folder)
 
-        # checkout azure-rest-api-specs-examples repo
-        cmd = ['git', 'clone',
-               '--quiet',
-               '--depth', '1',
-               operation.sdk_examples_repository, example_repo_path]
+        # checkout azure-rest-api-specs-examples repo, from local mirror
         logging.info(f'Checking out repository: {operation.sdk_examples_repository}')
-        logging.info('Command line: ' + ' '.join(cmd))
-        subprocess.check_call(cmd, cwd=tmp_path)
-
-        # checkout sdk repo
-        cmd = ['git', 'clone',
-               '-c', 'advice.detachedHead=false',
-               '--quiet',
-               '--depth', '1',
-               '--branch', release.tag,
-               sdk.repository, sdk_repo_path]
-        logging.info(f'Checking out repository: {sdk.repository}')
-        logging.info('Command line: ' + ' '.join(cmd))
-        subprocess.check_call(cmd, cwd=tmp_path)
-
-        # prepare input.json
-        input_json_path = path.join(tmp_path, 'input.json')
-        output_json_path = path.join(tmp_path, 'output.json')
-        with open(input_json_path, 'w', encoding='utf-8') as f_out:
-            input_json = {
-                'specsPath': spec_repo_path,
-                'sdkExamplesPath': example_repo_path,
-                'sdkPath': sdk_repo_path,
-                'tempPath': tmp_path,
-                'release': {
-                    'tag': release.tag,
-                    'package': release.package,
-                    'version': release.version
-                }
-            }
-            logging.info(f'Input JSON for worker: {input_json}')
-            json.dump(input_json, f_out, indent=2)
-
-        # run script
-        logging.info(f'Running worker: {sdk.script.run}')
+        repository_cache.checkout_branch(operation.sdk_examples_repository, examples_branch, example_repo_path)
+
+        if sdk.requires_specs:
+            prepare_specs_repository()
+
+        # checkout sdk repo, from local mirror
+        logging.info(f'Checking out repository: {sdk.repository}, tag {release.tag}')
+        repository_cache.checkout(sdk.repository, release.tag, sdk_repo_path,
+                                  get_sparse_checkout_paths(sdk, release))
+
+        worker_cache_path = path.join(tmp_root_path, tmp_cache_folder, tmp_worker_cache_folder, sdk.language)
+        os.makedirs(worker_cache_path, exist_ok=True)
+        worker_input = WorkerInput(spec_repo_path, example_repo_path, sdk_repo_path, tmp_path, release,
+                                   worker_cache_path)
+        logging.info(f'Input JSON for worker: {worker_input.to_json()}')
+
+        # run worker
         start = time.perf_counter()
-        subprocess.check_call([sdk.script.run, input_json_path, output_json_path], cwd=root_path)
+        if sdk.script.module:
+            try:
+                worker_output = run_worker_in_process(path.join(root_path, sdk.script.module), worker_input)
+            except Exception as e:
+                logging.error(f'Worker error: {e}')
+                worker_output = WorkerOutput(release.tag, False, [])
+        else:
+            worker_output = run_worker_script(sdk.script.run, root_path, tmp_path, worker_input)
         end = time.perf_counter()
         logging.info(f'Worker ran: {str(timedelta(seconds=end-start))}')
 
-        # parse output.json
-        release_name = release.tag
-        succeeded = True
-        files = []
-        if path.isfile(output_json_path):
-            with open(output_json_path, 'r', encoding='utf-8') as f_in:
-                output = json.load(f_in)
-                logging.info(f'Output JSON from worker: {output}')
-                release_name = output['name']
-                succeeded = ('succeeded' == output['status'])
-                files = output['files']
+        release_name = worker_output.name
+        succeeded = worker_output.succeeded
+        files = worker_output.files
 
         if not succeeded:
             report.statuses[release.tag] = 'failed at worker'
@@ -177,7 +199,6 @@ def process_release(operation: OperationConfiguration, sdk: SdkConfiguration, re
             changed_files = [file.strip()[3:] for file in output_str.splitlines()]
 
             # git checkout new branch
-            branch = f'automation-examples_{sdk.name}_{release.tag}_{operation.build_id}'
             cmd = ['git', 'checkout', '-b', branch]
             logging.info('Command line: ' + ' '.join(cmd))
             subprocess.check_call(cmd, cwd=example_repo_path)
@@ -203,7 +224,7 @@ def process_release(operation: OperationConfiguration, sdk: SdkConfiguration, re
                 # create github pull request
                 head = f'{operation.repository_owner}:{branch}'
                 repo = GitHubRepository(operation.repository_owner, operation.repository_name, github_token)
-                pull_number = repo.create_pull_request(title, head, 'main')
+                pull_number = repo.create_pull_request(title, head, examples_branch)
                 repo.add_label(pull_number, ['auto-merge'])
             except Exception as e:
                 logging.error(f'Error: {e}')
@@ -229,13 +250,45 @@ def process_release(operation: OperationConfiguration, sdk: SdkConfiguration, re
         report.aggregated_error.errors.append(e)
     finally:
         if clean_tmp_dir:
+            if path.isdir(example_repo_path):
+                repository_cache.remove(operation.sdk_examples_repository, example_repo_path, branch)
+            if path.isdir(sdk_repo_path):
+                repository_cache.remove(sdk.repository, sdk_repo_path)
             shutil.rmtree(tmp_path, ignore_errors=True)
 
 
-def query_releases_in_database(language: str) -> List[Release]:
-    # query local database on processed releases
+def prepare_specs_repository():
+    # checkout azure-rest-api-specs repo, on first request
+
+    global spec_repo_prepared
+    with spec_repo_lock:
+        if not spec_repo_prepared:
+            tmp_root_path = path.join(root_path, tmp_folder)
+            spec_repo_path = path.join(tmp_root_path, tmp_spec_folder)
+            if path.isdir(spec_repo_path):
+                # left from previous run
+                repository_cache.remove(spec_repo, spec_repo_path)
+                shutil.rmtree(spec_repo_path, ignore_errors=True)
+
+            logging.info(f'Checking out repository: {spec_repo}')
+            repository_cache.fetch_branch(spec_repo, spec_repo_branch)
+            repository_cache.checkout_branch(spec_repo, spec_repo_branch, spec_repo_path)
+            spec_repo_prepared = True
+
+
+def get_sparse_checkout_paths(sdk: SdkConfiguration, release: Release) -> List[str]:
+    # paths in SDK repository that the worker requires for the release
+
+    package_name = release.package.split('/')[-1]
+    return [sparse_path.format(package=release.package, package_name=package_name,
+                               version=release.version, tag=release.tag)
+            for sparse_path in sdk.sparse_checkout_paths]
 
-    return csv_database.query_releases(language)
+
+def query_release_tags_in_database(language: str) -> FrozenSet[str]:
+    # query local database on tags of processed releases
+
+    return csv_database.query_release_tags(language)
 
 
 def commit_database(release_name: str, language: str, release: Release, changed_files: List[str]):
@@ -245,11 +298,12 @@ def commit_database(release_name: str, language: str, release: Release, changed_
     changed_files = [file for file in changed_files if not file.endswith('.json')]
 
     if changed_files:
-        database_succeeded = csv_database.new_release(
-            release_name, language, release.tag, release.package, release.version, release.date, changed_files)
-        if database_succeeded:
-            csv_database.dump()
-            csv_database.commit(release_name)
+        # releases are processed concurrently, database and its git repository are guarded by lock
+        with csv_database_lock:
+            database_succeeded = csv_database.new_release(
+                release_name, language, release.tag, release.package, release.version, release.date, changed_files)
+            if database_succeeded:
+                csv_database.commit(release_name)
 
 
 def process_sdk(operation: OperationConfiguration, sdk: SdkConfiguration, report: Report):
@@ -262,8 +316,9 @@ def process_sdk(operation: OperationConfiguration, sdk: SdkConfiguration, report
     logging.info(f'Processing sdk: {sdk.name}')
     count = 0
     releases: List[Release] = []
-    repo = GitHubRepository(sdk.repository_owner, sdk.repository_name, github_token)
-    # since there is no ordering from GitHub, just get all releases (exclude draft=True), and hope paging is correct
+    repo = GitHubRepository(sdk.repository_owner, sdk.repository_name, github_token,
+                            path.join(root_path, tmp_folder, tmp_cache_folder, tmp_github_cache_folder))
+    # releases are listed from newest to oldest (exclude draft=True), stop when a page is older than date_start
     for page in itertools.count(start=1):
         try:
             releases_response_json = repo.list_releases(100, page)
@@ -271,9 +326,12 @@ def process_sdk(operation: OperationConfiguration, sdk: SdkConfiguration, report
                 # no more result, we are done
                 break
             count += len(releases_response_json)
+            page_before_date_start = True
             for release in releases_response_json:
                 if not release['draft']:
                     published_at = datetime.fromisoformat(release['published_at'].replace('Z', '+00:00'))
+                    if published_at >= operation.date_start:
+                        page_before_date_start = False
                     if operation.date_start < published_at < operation.date_end:
                         release_tag = release['tag_name']
                         if re.match(sdk.release_tag.regex_match, release_tag):
@@ -282,6 +340,12 @@ def process_sdk(operation: OperationConfiguration, sdk: SdkConfiguration, report
                             release = Release(release_tag, package, version, published_at)
                             releases.append(release)
                             logging.info(f'Found release tag: {release.tag}')
+                else:
+                    # draft release has no publish date
+                    page_before_date_start = False
+            if page_before_date_start:
+                # all releases in this page are older, we are done
+                break
         except Exception as e:
             report.aggregated_error.errors.append(e)
             break
@@ -291,17 +355,14 @@ def process_sdk(operation: OperationConfiguration, sdk: SdkConfiguration, report
     for release in releases:
         logging.info(f'Candidate release tag: {release.tag}, on {release.date.date()}')
 
-    processed_release_tags = set()
+    processed_release_tags = frozenset()
     if operation.skip_processed:
-        processed_releases = query_releases_in_database(sdk.language)
-        processed_release_tags.update([r.tag for r in processed_releases])
+        processed_release_tags = query_release_tags_in_database(sdk.language)
 
+    # select the latest release for each package, before scheduling
+    scheduled_releases: List[Release] = []
     processed_release_packages = set()
     for release in releases:
-        if time.time() > start_time_secs + timeout_secs:
-            logging.warning("Timeout, skip remaining packages")
-            break
-
         if release.tag in processed_release_tags:
             logging.info(f'Skip processed tag: {release.tag}')
             processed_release_packages.add(release.package)
@@ -310,9 +371,43 @@ def process_sdk(operation: OperationConfiguration, sdk: SdkConfiguration, report
         elif release.package in sdk.ignored_packages:
             logging.info(f'Skip ignored package: {release.tag}')
         else:
-            process_release(operation, sdk, release, report)
+            scheduled_releases.append(release)
             processed_release_packages.add(release.package)
 
+    # fetch all release tags to local mirror in one call
+    try:
+        repository_cache.fetch(sdk.repository, [release.tag for release in scheduled_releases],
+                               blob_filter=bool(sdk.sparse_checkout_paths))
+    except subprocess.CalledProcessError as e:
+        # tags will be fetched one by one on checkout
+        logging.warning(f'Call error: {e}')
+
+    # releases of different packages are independent, process them in a bounded worker pool
+    max_workers = min(operation.max_workers, sdk.max_workers) if sdk.max_workers else operation.max_workers
+    max_workers = max(1, max_workers)
+    logging.info(f'Processing {len(scheduled_releases)} releases with {max_workers} workers')
+    with ThreadPoolExecutor(max_workers=max_workers,
+                            thread_name_prefix=f'{sdk.language}-worker') as executor:
+        futures = [executor.submit(process_release_before_timeout, operation, sdk, release, report)
+                   for release in scheduled_releases]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logging.error(f'Error: {e}')
+                report.aggregated_error.errors.append(e)
+
+
+def process_release_before_timeout(operation: OperationConfiguration, sdk: SdkConfiguration, release: Release,
+                                   report: Report):
+    # timeout is checked when the release is picked up by a worker, as it may wait in the queue
+
+    if time.time() > start_time_secs + timeout_secs:
+        logging.warning(f'Timeout, skip release: {release.tag}')
+        report.statuses[release.tag] = 'skipped, timeout'
+    else:
+        process_release(operation, sdk, release, report)
+
 
 def process(command_line: CommandLineConfiguration, report: Report):
     configuration = load_configuration(command_line)
@@ -320,32 +415,56 @@ def process(command_line: CommandLineConfiguration, report: Report):
     if command_line.merge_pr:
         merge_pull_requests(configuration.operation)
 
-    # checkout azure-rest-api-specs repo
     tmp_root_path = path.join(root_path, tmp_folder)
     os.makedirs(tmp_root_path, exist_ok=True)
-    spec_repo_path = path.join(tmp_root_path, tmp_spec_folder)
-    spec_repo = 'https://github.com/Azure/azure-rest-api-specs'
-    cmd = ['git', 'clone',
-           '--quiet',
-           '--depth', '1',
-           spec_repo, spec_repo_path]
-    logging.info(f'Checking out repository: {spec_repo}')
-    logging.info('Command line: ' + ' '.join(cmd))
-    subprocess.check_call(cmd, cwd=tmp_root_path)
+
+    # all releases branch from the same main of azure-rest-api-specs-examples repo
+    global repository_cache
+    repository_cache = RepositoryCache(path.join(tmp_root_path, tmp_cache_folder))
+    logging.info(f'Fetching repository: {configuration.operation.sdk_examples_repository}, branch {examples_branch}')
+    repository_cache.fetch_branch(configuration.operation.sdk_examples_repository, examples_branch)
 
     # checkout and load database
     global csv_database
-    csv_database = CsvDatabase(tmp_root_path)
+    csvdb_cache_path = path.join(tmp_root_path, tmp_cache_folder, tmp_csvdb_cache_folder)
+    # releases are journaled, if they are to be pushed
+    journal_path = path.join(csvdb_cache_path, csvdb_journal_file) if command_line.persist_data else None
+    if command_line.database == 'sqlite':
+        csv_database = SqliteDatabase(tmp_root_path, path.join(tmp_root_path, tmp_sqlite_database_file),
+                                      journal_path, command_line.commit_batch_size)
+    else:
+        csv_database = CsvDatabase(tmp_root_path, csvdb_cache_path, journal_path, command_line.commit_batch_size)
     csv_database.checkout()
     csv_database.load()
 
-    for sdk_configuration in configuration.sdks:
-        if not command_line.language or command_line.language == sdk_configuration.language:
+    sdk_configurations = [sdk_configuration for sdk_configuration in configuration.sdks
+                          if not command_line.language or command_line.language == sdk_configuration.language]
+    if command_line.parallel_sdks:
+        # each SDK runs on its own lane, all lanes share the same deadline and report
+        with ThreadPoolExecutor(max_workers=max(1, len(sdk_configurations)),
+                                thread_name_prefix='sdk') as executor:
+            futures = [executor.submit(process_sdk, configuration.operation, sdk_configuration, report)
+                       for sdk_configuration in sdk_configurations]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f'Error: {e}')
+                    report.aggregated_error.errors.append(e)
+    else:
+        for sdk_configuration in sdk_configurations:
             process_sdk(configuration.operation, sdk_configuration, report)
 
+    # commit releases pending in batch
+    csv_database.flush()
+
     if command_line.persist_data:
         csv_database.push(github_token)
 
+    rate_limit_status = get_rate_limit_status()
+    logging.info(f'GitHub requests: {rate_limit_status.request_count}, retries: {rate_limit_status.retry_count}, '
+                 f'rate limit remaining: {rate_limit_status.remaining}/{rate_limit_status.limit}')
+
 
 def main():
     global root_path
@@ -353,7 +472,7 @@ def main():
     global start_time_secs
 
     logging.basicConfig(level=logging.INFO,
-                        format='%(asctime)s [%(levelname)s] %(message)s',
+                        format='%(asctime)s [%(levelname)s] [%(threadName)s] %(message)s',
                         datefmt='%Y-%m-%d %X')
 
     start_time_secs = time.time()
@@ -376,6 +495,14 @@ def main():
                         help='Skip SDK releases that already been processed')
     parser.add_argument('--merge-pull-request', type=str, required=False, default='false',
                         help='Merge GitHub pull request before new processing')
+    parser.add_argument('--max-workers', type=int, required=False, default=1,
+                        help='Maximum number of releases of an SDK to be processed in parallel')
+    parser.add_argument('--parallel-sdks', type=str, required=False, default='false',
+                        help='Process SDK of different languages in parallel')
+    parser.add_argument('--database', type=str, required=False, default='csv', choices=['csv', 'sqlite'],
+                        help='Storage of database during processing, always persisted as CSV')
+    parser.add_argument('--commit-batch-size', type=int, required=False, default=1,
+                        help='Commit database every N releases, 0 to commit once per run')
     args = parser.parse_args()
 
     github_token = args.github_token
@@ -383,7 +510,11 @@ def main():
     command_line_configuration = CommandLineConfiguration(args.build_id, args.release_in_days, args.language,
                                                           args.persist_data.lower() == 'true',
                                                           args.skip_processed.lower() == 'true',
-                                                          args.merge_pull_request.lower() == 'true')
+                                                          args.merge_pull_request.lower() == 'true',
+                                                          args.max_workers,
+                                                          args.parallel_sdks.lower() == 'true',
+                                                          args.database,
+                                                          args.commit_batch_size)
 
     report = Report({}, AggregatedError([]))
     process(command_line_configuration, report)
@@ -1,7 +1,7 @@
 import dataclasses
 import re
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Any, Optional
 
 
 @dataclasses.dataclass(eq=True, frozen=True)
@@ -12,6 +12,7 @@ class OperationConfiguration:
     persist_data: bool
     date_start: datetime
     date_end: datetime
+    max_workers: int = 1
 
     @property
     def repository_owner(self) -> str:
@@ -32,6 +33,8 @@ class ReleaseTagConfiguration:
 @dataclasses.dataclass(eq=True)
 class Script:
     run: str
+    # Python module of the worker, which runs in process if provided
+    module: Optional[str] = None
 
 
 @dataclasses.dataclass(eq=True, frozen=True)
@@ -42,6 +45,12 @@ class SdkConfiguration:
     release_tag: ReleaseTagConfiguration
     script: Script
     ignored_packages: List[str]
+    max_workers: Optional[int] = None
+    # paths to checkout from SDK repository, in gitignore style, with placeholders of {package}, {package_name},
+    # {version} and {tag}
+    sparse_checkout_paths: List[str] = dataclasses.field(default_factory=list)
+    # whether the worker reads azure-rest-api-specs repository
+    requires_specs: bool = False
 
     @property
     def repository_owner(self) -> str:
@@ -66,6 +75,10 @@ class CommandLineConfiguration:
     persist_data: bool
     skip_processed: bool
     merge_pr: bool
+    max_workers: int = 1
+    parallel_sdks: bool = False
+    database: str = 'csv'
+    commit_batch_size: int = 1
 
 
 @dataclasses.dataclass(eq=True, frozen=True)
@@ -85,3 +98,41 @@ class AggregatedError:
 class Report:
     statuses: Dict[str, str]
     aggregated_error: AggregatedError
+
+
+@dataclasses.dataclass(eq=True, frozen=True)
+class WorkerInput:
+    specs_path: str
+    sdk_examples_path: str
+    sdk_path: str
+    temp_path: str
+    release: Release
+    # folder persisted between releases and runs, for the worker of the SDK
+    cache_path: Optional[str] = None
+
+    def to_json(self) -> Dict[str, Any]:
+        config = {
+            'specsPath': self.specs_path,
+            'sdkExamplesPath': self.sdk_examples_path,
+            'sdkPath': self.sdk_path,
+            'tempPath': self.temp_path,
+            'release': {
+                'tag': self.release.tag,
+                'package': self.release.package,
+                'version': self.release.version
+            }
+        }
+        if self.cache_path:
+            config['cachePath'] = self.cache_path
+        return config
+
+
+@dataclasses.dataclass(eq=True, frozen=True)
+class WorkerOutput:
+    name: str
+    succeeded: bool
+    files: List[str]
+
+    @staticmethod
+    def from_json(output: Dict[str, Any]) -> 'WorkerOutput':
+        return WorkerOutput(output['name'], 'succeeded' == output['status'], output['files'])
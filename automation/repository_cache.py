@@ -0,0 +1,138 @@
+import os
+from os import path
+import re
+import subprocess
+import threading
+import logging
+from typing import List, Dict, Optional
+
+
+class RepositoryCache:
+    # local bare mirror of git repositories, from which working copies are materialized as git worktree
+
+    cache_dir: str
+
+    _locks: Dict[str, threading.Lock]
+    _locks_lock: threading.Lock
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def fetch(self, repository: str, tags: List[str], blob_filter: bool = False):
+        # fetch tags to the mirror in a single call, skip tags that already in mirror
+        # blob_filter makes the mirror a partial clone, blobs are fetched on demand at checkout
+
+        mirror_path = self._mirror_path(repository)
+        with self._lock(mirror_path):
+            self._prepare_mirror(repository, mirror_path)
+
+            existing_tags = set(self._list_tags(mirror_path))
+            missing_tags = [tag for tag in tags if tag not in existing_tags]
+            if missing_tags:
+                self._fetch_refs(repository, mirror_path, [f'+refs/tags/{tag}:refs/tags/{tag}' for tag in missing_tags],
+                                 blob_filter)
+
+    def fetch_branch(self, repository: str, branch: str):
+        # fetch (or update) the branch to the mirror, as remote-tracking branch
+
+        mirror_path = self._mirror_path(repository)
+        with self._lock(mirror_path):
+            self._prepare_mirror(repository, mirror_path)
+
+            self._fetch_refs(repository, mirror_path, [f'+refs/heads/{branch}:refs/remotes/origin/{branch}'], False)
+
+    def checkout_branch(self, repository: str, branch: str, work_path: str):
+        # materialize the branch previously fetched by fetch_branch, to work_path as detached HEAD
+
+        mirror_path = self._mirror_path(repository)
+        with self._lock(mirror_path):
+            cmd = ['git', '-c', 'advice.detachedHead=false',
+                   'worktree', 'add', '--quiet', '--detach', path.abspath(work_path), f'refs/remotes/origin/{branch}']
+            logging.info('Command line: ' + ' '.join(cmd))
+            subprocess.check_call(cmd, cwd=mirror_path)
+
+    def checkout(self, repository: str, tag: str, work_path: str, sparse_paths: Optional[List[str]] = None):
+        # materialize the tag from mirror to work_path
+        # if sparse_paths is provided, only these paths (in gitignore style) are checked out
+
+        mirror_path = self._mirror_path(repository)
+        with self._lock(mirror_path):
+            self._prepare_mirror(repository, mirror_path)
+
+            if tag not in self._list_tags(mirror_path):
+                self._fetch_refs(repository, mirror_path, [f'+refs/tags/{tag}:refs/tags/{tag}'],
+                                 bool(sparse_paths))
+
+            cmd = ['git', '-c', 'advice.detachedHead=false',
+                   'worktree', 'add', '--quiet', '--detach'] \
+                + (['--no-checkout'] if sparse_paths else []) \
+                + [path.abspath(work_path), f'refs/tags/{tag}']
+            logging.info('Command line: ' + ' '.join(cmd))
+            subprocess.check_call(cmd, cwd=mirror_path)
+
+            if sparse_paths:
+                cmd = ['git', 'sparse-checkout', 'set', '--no-cone'] + sparse_paths
+                logging.info('Command line: ' + ' '.join(cmd))
+                subprocess.check_call(cmd, cwd=work_path)
+
+                cmd = ['git', 'checkout', '--quiet', '--detach']
+                logging.info('Command line: ' + ' '.join(cmd))
+                subprocess.check_call(cmd, cwd=work_path)
+
+    def remove(self, repository: str, work_path: str, branch: Optional[str] = None):
+        # remove the working copy materialized by checkout, and the local branch created in it
+
+        mirror_path = self._mirror_path(repository)
+        if not path.isdir(mirror_path):
+            return
+
+        with self._lock(mirror_path):
+            cmd = ['git', 'worktree', 'remove', '--force', path.abspath(work_path)]
+            logging.info('Command line: ' + ' '.join(cmd))
+            subprocess.call(cmd, cwd=mirror_path)
+
+            if branch:
+                cmd = ['git', 'update-ref', '-d', f'refs/heads/{branch}']
+                logging.info('Command line: ' + ' '.join(cmd))
+                subprocess.call(cmd, cwd=mirror_path)
+
+    def _prepare_mirror(self, repository: str, mirror_path: str):
+        if not path.isfile(path.join(mirror_path, 'HEAD')):
+            os.makedirs(mirror_path, exist_ok=True)
+            cmd = ['git', 'init', '--quiet', '--bare']
+            logging.info('Command line: ' + ' '.join(cmd))
+            subprocess.check_call(cmd, cwd=mirror_path)
+
+            cmd = ['git', 'remote', 'add', 'origin', repository]
+            logging.info('Command line: ' + ' '.join(cmd))
+            subprocess.check_call(cmd, cwd=mirror_path)
+        else:
+            # clean up worktree whose directory is already deleted
+            cmd = ['git', 'worktree', 'prune']
+            subprocess.check_call(cmd, cwd=mirror_path)
+
+    def _fetch_refs(self, repository: str, mirror_path: str, refspecs: List[str], blob_filter: bool):
+        cmd = ['git', 'fetch', '--quiet', '--depth', '1', '--no-tags'] \
+            + (['--filter=blob:none'] if blob_filter else []) \
+            + ['origin'] + refspecs
+        logging.info(f'Fetching {len(refspecs)} refs from repository: {repository}')
+        logging.info('Command line: ' + ' '.join(cmd))
+        subprocess.check_call(cmd, cwd=mirror_path)
+
+    def _list_tags(self, mirror_path: str) -> List[str]:
+        cmd = ['git', 'for-each-ref', '--format=%(refname:lstrip=2)', 'refs/tags']
+        output = subprocess.check_output(cmd, cwd=mirror_path)
+        return str(output, 'utf-8').splitlines()
+
+    def _mirror_path(self, repository: str) -> str:
+        name = re.sub(r'[^\w.-]+', '_', re.sub(r'^\w+://', '', repository)).strip('_')
+        return path.join(self.cache_dir, name + '.git')
+
+    def _lock(self, mirror_path: str) -> threading.Lock:
+        # git operations on the same mirror are serialized
+        with self._locks_lock:
+            if mirror_path not in self._locks:
+                self._locks[mirror_path] = threading.Lock()
+            return self._locks[mirror_path]
@@ -0,0 +1,153 @@
+import os
+from os import path
+import csv
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from typing import List, FrozenSet, Optional, Union
+
+from database import Database, release_header, file_header
+from models import Release
+
+
+# AUTOINCREMENT keeps id of removed row from being reused, same as CsvDatabase
+schema_script: str = '''
+CREATE TABLE release (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    language TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    package TEXT NOT NULL,
+    version TEXT NOT NULL,
+    date_epoch INTEGER NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE INDEX release_name_language ON release (name, language);
+CREATE INDEX release_language_date_epoch ON release (language, date_epoch);
+
+CREATE TABLE file (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file TEXT NOT NULL,
+    release_id INTEGER NOT NULL
+);
+CREATE INDEX file_file ON file (file);
+CREATE INDEX file_release_id ON file (release_id);
+'''
+
+
+class SqliteDatabase(Database):
+    # metadata in SQLite, the CSV files are imported at load, and exported at dump
+    # the CSV files are the source of truth, the SQLite file is a working copy rebuilt at every load,
+    # so that it never diverges from the metadata branch; it does not persist between runs
+
+    database_path: str
+
+    connection: Optional[sqlite3.Connection] = None
+    _lock: threading.Lock
+
+    def __init__(self, work_dir: str, database_path: str = ':memory:', journal_path: Optional[str] = None,
+                 commit_batch_size: int = 1):
+        super().__init__(work_dir, journal_path, commit_batch_size)
+        self.database_path = database_path
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self.connection:
+            self.connection.close()
+        # discard the working copy of previous load or run
+        if self.database_path != ':memory:' and path.exists(self.database_path):
+            os.remove(self.database_path)
+
+        self.connection = sqlite3.connect(self.database_path, check_same_thread=False)
+        with self._lock, self.connection:
+            self.connection.executescript(schema_script)
+
+            with open(self.index_file_path, 'r', newline='') as csv_file:
+                csv_reader = csv.reader(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+                next(csv_reader, None)  # skip header row
+                self.connection.executemany('INSERT INTO release VALUES (?, ?, ?, ?, ?, ?, ?, ?)', csv_reader)
+
+            with open(self.list_file_path, 'r', newline='') as csv_file:
+                csv_reader = csv.reader(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+                next(csv_reader, None)  # skip header row
+                self.connection.executemany('INSERT INTO file VALUES (?, ?, ?)', csv_reader)
+
+        logging.info(f'Database loaded to SQLite: {self.database_path}')
+
+        self._replay_journal()
+
+    def dump(self):
+        # export to CSV files of the same schema
+        with self._lock:
+            self._export('SELECT * FROM release ORDER BY id', self.index_file_path, release_header)
+            self._export('SELECT * FROM file ORDER BY id', self.list_file_path, file_header)
+
+    def _new_release(self, name: str, language: str, tag: str, package: str, version: str, date: datetime,
+                     files: List[str]) -> bool:
+        if self._query_release(name, language):
+            logging.warning(f'Release already exists for {language}#{name}')
+            return False
+
+        date_epoch = int(date.timestamp())
+        date_str = datetime.fromtimestamp(date_epoch).strftime('%m/%d/%Y')
+
+        with self._lock, self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO release (name, language, tag, package, version, date_epoch, date) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (name, language, tag, package, version, date_epoch, date_str))
+            release_id = cursor.lastrowid
+
+            # remove 'file' that already in DB -- maintain column 'file' be unique
+            self.connection.executemany('DELETE FROM file WHERE file = ?', ((file,) for file in files))
+            self.connection.executemany('INSERT INTO file (file, release_id) VALUES (?, ?)',
+                                        ((file, release_id) for file in files))
+
+        return True
+
+    def query_releases(self, language: str) -> List[Release]:
+        # query processed releases
+
+        return self._query_releases('SELECT tag, package, version, date_epoch FROM release '
+                                    'WHERE language = ? ORDER BY id', (language,))
+
+    def query_releases_since(self, language: str, date: datetime) -> List[Release]:
+        # query processed releases, published on or after the date
+
+        return self._query_releases('SELECT tag, package, version, date_epoch FROM release '
+                                    'WHERE language = ? AND date_epoch >= ? ORDER BY date_epoch',
+                                    (language, int(date.timestamp())))
+
+    def query_file_release(self, file: str) -> Optional[Release]:
+        # query the release that last produced the example file
+
+        releases = self._query_releases('SELECT release.tag, release.package, release.version, release.date_epoch '
+                                        'FROM file JOIN release ON release.id = file.release_id '
+                                        'WHERE file.file = ? ORDER BY file.id DESC LIMIT 1', (file,))
+        return releases[0] if releases else None
+
+    def query_release_tags(self, language: str) -> FrozenSet[str]:
+        # query tags of processed releases
+
+        with self._lock:
+            rows = self.connection.execute('SELECT tag FROM release WHERE language = ?', (language,)).fetchall()
+        return frozenset(tag for tag, in rows)
+
+    def _query_release(self, name: str, language: str) -> Union[int, None]:
+        with self._lock:
+            row = self.connection.execute('SELECT id FROM release WHERE name = ? AND language = ? ORDER BY id LIMIT 1',
+                                          (name, language)).fetchone()
+        return row[0] if row else None
+
+    def _query_releases(self, sql: str, parameters: tuple) -> List[Release]:
+        with self._lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        return [Release(tag, package, version, datetime.fromtimestamp(date_epoch))
+                for tag, package, version, date_epoch in rows]
+
+    def _export(self, sql: str, file_path: str, header: List[str]):
+        with open(file_path, 'w', newline='') as csv_file:
+            csv_writer = csv.writer(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            csv_writer.writerow(header)
+            csv_writer.writerows(self.connection.execute(sql))
@@ -0,0 +1,20 @@
+import unittest
+
+from benchmark_csv_database import benchmark
+
+
+class TestBenchmarkCsvDatabase(unittest.TestCase):
+
+    def test(self):
+        for database in ['csv', 'sqlite']:
+            result = benchmark(database, 300, 30, 2)
+            self.assertEqual(300, result['rows'])
+            for operation in ['load', 'new_release', 'query_releases', 'dump']:
+                self.assertGreaterEqual(result['operations'][operation]['seconds'], 0)
+                self.assertGreater(result['operations'][operation]['peak_bytes'], 0)
+
+    def test_snapshot(self):
+        # loading from snapshot is faster than parsing the CSV files
+        operations = benchmark('csv', 30000, 30, 2)['operations']
+        self.assertLess(operations['load_snapshot']['seconds'],
+                        operations['load']['seconds'] + operations['load_file_list']['seconds'])
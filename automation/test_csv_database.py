@@ -1,9 +1,12 @@
 import os
+import csv
 import unittest
 import shutil
+import subprocess
 from datetime import datetime
 from os import path
 
+import database
 from csv_database import CsvDatabase
 
 
@@ -96,3 +99,310 @@ class TestCsvDatabase(unittest.TestCase):
         self.assertEqual(3, len(releases))
 
         shutil.rmtree(path.join(work_dir, 'csvdb'), ignore_errors=True)
+
+    def test_typed_columns(self):
+        work_dir = path.abspath('csv_database_typed_test')
+        self._prepare_csv(work_dir)
+
+        test_db = CsvDatabase(work_dir)
+        test_db.load()
+
+        release_row = test_db.release_db.rows[1]
+        self.assertEqual(2, release_row.id)
+        self.assertEqual(1636606853, release_row.date_epoch)
+        self.assertEqual('azure-resourcemanager-signalr', release_row[4])
+        self.assertEqual(8, len(release_row))
+        self.assertIs(test_db.release_db.rows[0].language, release_row.language)
+        self.assertEqual(['specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/Usages_List.java', 2],
+                         test_db.file_db.rows[-1][1:])
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    def test_load_quoted_values(self):
+        work_dir = path.abspath('csv_database_quoted_test')
+        self._prepare_csv(work_dir)
+        list_file_path = path.join(work_dir, 'csvdb', 'java-library-example-list.csv')
+
+        # value with comma is quoted, and the last line has no line break
+        with open(list_file_path, 'w', newline='') as csv_file:
+            csv_file.write('id,file,release_id\r\n1,"examples-java/Foo,Bar.java",1\r\n2,examples-java/Baz.java,2')
+        test_db = CsvDatabase(work_dir)
+        test_db.load()
+        self.assertEqual([[1, 'examples-java/Foo,Bar.java', 1], [2, 'examples-java/Baz.java', 2]],
+                         test_db.file_db.rows)
+        self.assertEqual(3, test_db.file_db.next_id)
+
+        with open(list_file_path, 'w', newline='') as csv_file:
+            csv_file.write('id,file,release_id\n1,examples-java/Foo.java,1\n2,examples-java/Baz.java,2\n')
+        test_db = CsvDatabase(work_dir)
+        test_db.load()
+        self.assertEqual([[1, 'examples-java/Foo.java', 1], [2, 'examples-java/Baz.java', 2]],
+                         test_db.file_db.rows)
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    def test_new_release_replaces_files(self):
+        work_dir = path.abspath('csv_database_replace_test')
+        self._prepare_csv(work_dir)
+
+        test_db = CsvDatabase(work_dir)
+        test_db.load()
+
+        self.assertTrue(test_db.new_release(
+            'com.azure.resourcemanager:azure-resourcemanager-quota:1.0.0-beta.2', 'java',
+            'azure-resourcemanager-quota_1.0.0-beta.2', 'azure-resourcemanager-quota',
+            '1.0.0-beta.2', datetime.fromtimestamp(1636603745),
+            ['specification/quota/resource-manager/Microsoft.Quota/preview/2021-03-15-preview/examples-java/GetOperations.java']))
+        self.assertEqual(3, len(test_db.release_db.rows))
+        self.assertEqual(5, len(test_db.file_db.rows))
+        self.assertEqual({'azure-resourcemanager-confluent_1.0.0-beta.3', 'azure-resourcemanager-signalr_1.0.0-beta.3',
+                          'azure-resourcemanager-quota_1.0.0-beta.2'}, test_db.query_release_tags('java'))
+        self.assertEqual(set(), test_db.query_release_tags('go'))
+
+        # release already exists
+        self.assertFalse(test_db.new_release('com.azure.resourcemanager:azure-resourcemanager-quota:1.0.0-beta.2',
+                                             'java', 'azure-resourcemanager-quota_1.0.0-beta.2',
+                                             'azure-resourcemanager-quota', '1.0.0-beta.2',
+                                             datetime.fromtimestamp(1636603745), []))
+
+        # new release replaces files of previous release
+        release_tags = test_db.query_release_tags('java')
+        self.assertTrue(test_db.new_release(
+            'com.azure.resourcemanager:azure-resourcemanager-confluent:1.0.0', 'java',
+            'azure-resourcemanager-confluent_1.0.0', 'azure-resourcemanager-confluent',
+            '1.0.0', datetime.fromtimestamp(1636703745),
+            ['specification/confluent/resource-manager/Microsoft.Confluent/preview/2021-09-01-preview/examples-java/MarketplaceAgreements_Create.java',
+             'specification/confluent/resource-manager/Microsoft.Confluent/stable/2021-12-01/examples-java/MarketplaceAgreements_Create.java']))
+        self.assertEqual(4, len(test_db.release_db.rows))
+        self.assertEqual(6, len(test_db.file_db.rows))
+        self.assertEqual('specification/confluent/resource-manager/Microsoft.Confluent/preview/2021-09-01-preview/examples-java/MarketplaceAgreements_List.java',
+                         test_db.file_db.rows[0][1])
+        self.assertEqual([7, 'specification/confluent/resource-manager/Microsoft.Confluent/stable/2021-12-01/examples-java/MarketplaceAgreements_Create.java', 4],
+                         test_db.file_db.rows[-1])
+        self.assertIn('azure-resourcemanager-confluent_1.0.0', test_db.query_release_tags('java'))
+        # tags queried before are not modified by new release
+        self.assertIsInstance(release_tags, frozenset)
+        self.assertNotIn('azure-resourcemanager-confluent_1.0.0', release_tags)
+
+        test_db.dump()
+        test_db = CsvDatabase(work_dir)
+        test_db.load()
+        self.assertEqual(4, len(test_db.query_releases('java')))
+        self.assertEqual(6, len(test_db.file_db.rows))
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    def test_incremental_dump(self):
+        work_dir = path.abspath('csv_database_dump_test')
+        self._prepare_csv(work_dir)
+        list_file_path = path.join(work_dir, 'csvdb', 'java-library-example-list.csv')
+
+        test_db = CsvDatabase(work_dir)
+        test_db.load()
+
+        # append, then replace files in the middle of the list
+        test_db.new_release('com.azure.resourcemanager:azure-resourcemanager-quota:1.0.0-beta.3', 'java',
+                            'azure-resourcemanager-quota_1.0.0-beta.3', 'azure-resourcemanager-quota',
+                            '1.0.0-beta.3', datetime.fromtimestamp(1636803745),
+                            ['specification/quota/resource-manager/Microsoft.Quota/preview/2021-03-15-preview/examples-java/GetOperations.java'])
+        test_db.dump()
+        test_db.new_release('com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.0', 'java',
+                            'azure-resourcemanager-signalr_1.0.0', 'azure-resourcemanager-signalr',
+                            '1.0.0', datetime.fromtimestamp(1636903745),
+                            ['specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/SignalR_Get.java'])
+        test_db.dump()
+        # compact, as at push, then continue
+        test_db.file_db.compact()
+        test_db.new_release('com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.1', 'java',
+                            'azure-resourcemanager-signalr_1.0.1', 'azure-resourcemanager-signalr',
+                            '1.0.1', datetime.fromtimestamp(1637003745),
+                            ['specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/SignalR_Delete.java'])
+        test_db.dump()
+        with open(list_file_path, 'rb') as csv_file:
+            incremental_content = csv_file.read()
+
+        # same as the file written at once
+        test_db = CsvDatabase(work_dir)
+        test_db.load()
+        self.assertEqual(5, len(test_db.release_db.rows))
+        self.assertEqual(6, len(test_db.file_db.rows))
+        full_file_path = path.join(work_dir, 'full.csv')
+        with open(full_file_path, 'w', newline='') as csv_file:
+            csv_writer = csv.writer(csv_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            csv_writer.writerow(['id', 'file', 'release_id'])
+            csv_writer.writerows(test_db.file_db.rows)
+        with open(full_file_path, 'rb') as csv_file:
+            self.assertEqual(incremental_content, csv_file.read())
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    def test_snapshot(self):
+        work_dir = path.abspath('csv_database_snapshot_test')
+        shutil.rmtree(work_dir, ignore_errors=True)
+        metadata_path = path.join(work_dir, 'csvdb')
+        os.makedirs(metadata_path)
+        snapshot_dir = path.join(work_dir, 'snapshot')
+
+        index_file_path = path.join(metadata_path, 'java-library-example-index.csv')
+        list_file_path = path.join(metadata_path, 'java-library-example-list.csv')
+
+        def write_csv(file_path: str, content: str):
+            with open(file_path, 'w', newline='') as csv_file:
+                csv_file.write(content)
+
+        write_csv(index_file_path, '''id,name,language,tag,package,version,date_epoch,date
+1,com.azure.resourcemanager:azure-resourcemanager-confluent:1.0.0-beta.3,java,azure-resourcemanager-confluent_1.0.0-beta.3,azure-resourcemanager-confluent,1.0.0-beta.3,1636608276,11/11/2021
+''')
+        write_csv(list_file_path, '''id,file,release_id
+1,specification/confluent/resource-manager/Microsoft.Confluent/preview/2021-09-01-preview/examples-java/Organization_Get.java,1
+''')
+        subprocess.check_call(['git', 'init', '--quiet'], cwd=metadata_path)
+        subprocess.check_call(['git', 'add', '--all'], cwd=metadata_path)
+        subprocess.check_call(['git', '-c', 'user.name=test', '-c', 'user.email=test@test',
+                               'commit', '--quiet', '-m', 'metadata'], cwd=metadata_path)
+
+        test_db = CsvDatabase(work_dir, snapshot_dir)
+        test_db.load()
+        self.assertTrue(path.isfile(path.join(snapshot_dir, 'java-library-example-index.pickle')))
+        # file list is not loaded until required
+        self.assertFalse(path.isfile(path.join(snapshot_dir, 'java-library-example-list.pickle')))
+        self.assertEqual(2, test_db.file_db.next_id)
+        self.assertTrue(path.isfile(path.join(snapshot_dir, 'java-library-example-list.pickle')))
+
+        # same commit and size, loaded from snapshot
+        write_csv(index_file_path, '''id,name,language,tag,package,version,date_epoch,date
+1,com.azure.resourcemanager:azure-resourcemanager-confluent:1.0.0-beta.4,java,azure-resourcemanager-confluent_1.0.0-beta.4,azure-resourcemanager-confluent,1.0.0-beta.4,1636608276,11/11/2021
+''')
+        test_db = CsvDatabase(work_dir, snapshot_dir)
+        test_db.load()
+        releases = test_db.query_releases('java')
+        self.assertEqual('1.0.0-beta.3', releases[0].version)
+        self.assertEqual(2, test_db.file_db.next_id)
+        self.assertIsNotNone(test_db.file_db.get('specification/confluent/resource-manager/Microsoft.Confluent/preview/2021-09-01-preview/examples-java/Organization_Get.java'))
+
+        # new commit, loaded from CSV
+        subprocess.check_call(['git', '-c', 'user.name=test', '-c', 'user.email=test@test',
+                               'commit', '--quiet', '--all', '-m', 'metadata'], cwd=metadata_path)
+        test_db = CsvDatabase(work_dir, snapshot_dir)
+        test_db.load()
+        releases = test_db.query_releases('java')
+        self.assertEqual('1.0.0-beta.4', releases[0].version)
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    def test_checkout(self):
+        work_dir = path.abspath('csv_database_checkout_test')
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+        # prepare a repository with metadata branch
+        repository_path = path.join(work_dir, 'origin')
+        os.makedirs(repository_path)
+        subprocess.check_call(['git', 'init', '--quiet', '--initial-branch=metadata'], cwd=repository_path)
+        subprocess.check_call(['git', 'config', 'uploadpack.allowFilter', 'true'], cwd=repository_path)
+        subprocess.check_call(['git', 'config', 'uploadpack.allowAnySHA1InWant', 'true'], cwd=repository_path)
+
+        def commit_files(content: str):
+            for filename in ['java-library-example-index.csv', 'java-library-example-list.csv', 'README.md']:
+                with open(path.join(repository_path, filename), 'w', newline='') as f:
+                    f.write(content)
+            subprocess.check_call(['git', 'add', '--all'], cwd=repository_path)
+            subprocess.check_call(['git', '-c', 'user.name=test', '-c', 'user.email=test@test',
+                                   'commit', '--quiet', '-m', content], cwd=repository_path)
+
+        commit_files('id\n')
+
+        original_example_repo = database.example_repo
+        database.example_repo = 'file://' + repository_path
+        try:
+            test_db = CsvDatabase(work_dir)
+            test_db.checkout()
+            metadata_path = test_db.example_metadata_path
+            self.assertTrue(path.isfile(path.join(metadata_path, 'java-library-example-index.csv')))
+            self.assertTrue(path.isfile(path.join(metadata_path, 'java-library-example-list.csv')))
+            self.assertFalse(path.isfile(path.join(metadata_path, 'README.md')))
+
+            # local change of previous run is discarded, and clone is updated
+            with open(path.join(metadata_path, 'java-library-example-index.csv'), 'w') as f:
+                f.write('local\n')
+            commit_files('id\nupdated\n')
+            test_db = CsvDatabase(work_dir)
+            test_db.checkout()
+            with open(path.join(metadata_path, 'java-library-example-index.csv'), 'r') as f:
+                self.assertEqual('id\nupdated\n', f.read())
+            self.assertFalse(path.isfile(path.join(metadata_path, 'README.md')))
+        finally:
+            database.example_repo = original_example_repo
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    def test_commit_batch(self):
+        work_dir = path.abspath('csv_database_batch_test')
+        shutil.rmtree(work_dir, ignore_errors=True)
+        metadata_path = path.join(work_dir, 'csvdb')
+        os.makedirs(metadata_path)
+        journal_path = path.join(work_dir, 'cache', 'journal.jsonl')
+
+        with open(path.join(metadata_path, 'java-library-example-index.csv'), 'w', newline='') as csv_file:
+            csv_file.write('id,name,language,tag,package,version,date_epoch,date\n')
+        with open(path.join(metadata_path, 'java-library-example-list.csv'), 'w', newline='') as csv_file:
+            csv_file.write('id,file,release_id\n')
+        subprocess.check_call(['git', 'init', '--quiet'], cwd=metadata_path)
+        subprocess.check_call(['git', 'add', '--all'], cwd=metadata_path)
+        subprocess.check_call(['git', '-c', 'user.name=test', '-c', 'user.email=test@test',
+                               'commit', '--quiet', '-m', 'metadata'], cwd=metadata_path)
+
+        def commit_count() -> int:
+            return int(subprocess.check_output(['git', 'rev-list', '--count', 'HEAD'], cwd=metadata_path))
+
+        def new_release(db: CsvDatabase, version: str):
+            name = f'com.azure.resourcemanager:azure-resourcemanager-quota:{version}'
+            db.new_release(name, 'java', f'azure-resourcemanager-quota_{version}', 'azure-resourcemanager-quota',
+                           version, datetime.fromtimestamp(1636603745),
+                           [f'specification/quota/resource-manager/Microsoft.Quota/preview/{version}/examples-java/GetOperations.java'])
+            db.commit(name)
+
+        test_db = CsvDatabase(work_dir, journal_path=journal_path, commit_batch_size=2)
+        test_db.load()
+        new_release(test_db, '1.0.0')
+        self.assertEqual(1, commit_count())
+        new_release(test_db, '1.0.1')
+        self.assertEqual(2, commit_count())
+        new_release(test_db, '1.0.2')
+        self.assertEqual(2, commit_count())
+
+        # crash before the 3rd release is committed, releases are replayed from journal
+        subprocess.check_call(['git', 'checkout', '--quiet', '--force', 'HEAD~1'], cwd=metadata_path)
+        test_db = CsvDatabase(work_dir, journal_path=journal_path, commit_batch_size=2)
+        test_db.load()
+        self.assertEqual(3, len(test_db.query_releases('java')))
+        self.assertEqual(3, len(test_db.file_db.rows))
+        self.assertEqual(['com.azure.resourcemanager:azure-resourcemanager-quota:1.0.0',
+                          'com.azure.resourcemanager:azure-resourcemanager-quota:1.0.1',
+                          'com.azure.resourcemanager:azure-resourcemanager-quota:1.0.2'],
+                         test_db.pending_tags)
+
+        test_db.flush()
+        self.assertEqual(2, commit_count())
+        self.assertEqual([], test_db.pending_tags)
+        test_db = CsvDatabase(work_dir)
+        test_db.load()
+        self.assertEqual(3, len(test_db.query_releases('java')))
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    @staticmethod
+    def _prepare_csv(work_dir: str):
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(path.join(work_dir, 'csvdb'))
+        with open(path.join(work_dir, 'csvdb', 'java-library-example-index.csv'), 'w', newline='') as csv_file:
+            csv_file.write('''id,name,language,tag,package,version,date_epoch,date
+1,com.azure.resourcemanager:azure-resourcemanager-confluent:1.0.0-beta.3,java,azure-resourcemanager-confluent_1.0.0-beta.3,azure-resourcemanager-confluent,1.0.0-beta.3,1636608276,11/11/2021
+2,com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.0-beta.3,java,azure-resourcemanager-signalr_1.0.0-beta.3,azure-resourcemanager-signalr,1.0.0-beta.3,1636606853,11/11/2021
+''')
+        with open(path.join(work_dir, 'csvdb', 'java-library-example-list.csv'), 'w', newline='') as csv_file:
+            csv_file.write('''id,file,release_id
+1,specification/confluent/resource-manager/Microsoft.Confluent/preview/2021-09-01-preview/examples-java/MarketplaceAgreements_Create.java,1
+2,specification/confluent/resource-manager/Microsoft.Confluent/preview/2021-09-01-preview/examples-java/MarketplaceAgreements_List.java,1
+3,specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/SignalR_Get.java,2
+4,specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/Usages_List.java,2
+''')
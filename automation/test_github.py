@@ -0,0 +1,92 @@
+import unittest
+import shutil
+from os import path
+from unittest import mock
+
+from github import GitHubRepository, get_rate_limit_status
+
+
+class TestGitHubRepository(unittest.TestCase):
+
+    def test_list_releases_cached(self):
+        cache_dir = path.abspath('github_cache_test')
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+        releases = [{'tag_name': 'azure-resourcemanager-confluent_1.0.0', 'draft': False,
+                     'published_at': '2021-11-11T05:24:36Z'}]
+        repo = GitHubRepository('Azure', 'azure-sdk-for-java', 'token', cache_dir)
+
+        with mock.patch('github._session.request') as mock_get:
+            mock_get.return_value = mock.Mock(status_code=200, headers={'ETag': '"etag1"'},
+                                              json=mock.Mock(return_value=releases))
+            self.assertEqual(releases, repo.list_releases(100, 1))
+            self.assertNotIn('If-None-Match', mock_get.call_args.kwargs['headers'])
+
+        with mock.patch('github._session.request') as mock_get:
+            mock_get.return_value = mock.Mock(status_code=304, headers={})
+            self.assertEqual(releases, repo.list_releases(100, 1))
+            self.assertEqual('"etag1"', mock_get.call_args.kwargs['headers']['If-None-Match'])
+
+        # different page is not cached
+        with mock.patch('github._session.request') as mock_get:
+            mock_get.return_value = mock.Mock(status_code=200, headers={}, json=mock.Mock(return_value=[]))
+            self.assertEqual([], repo.list_releases(100, 2))
+            self.assertNotIn('If-None-Match', mock_get.call_args.kwargs['headers'])
+
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def test_retry(self):
+        repo = GitHubRepository('Azure', 'azure-sdk-for-java', 'token')
+        repo.backoff_secs = 0
+
+        rate_limited_response = mock.Mock(status_code=403, headers={'Retry-After': '0', 'X-RateLimit-Remaining': '0'})
+        server_error_response = mock.Mock(status_code=502, headers={})
+        response = mock.Mock(status_code=200, headers={'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '4999',
+                                                        'X-RateLimit-Reset': '1636608276'},
+                             json=mock.Mock(return_value=[]))
+
+        retry_count = get_rate_limit_status().retry_count
+        with mock.patch('github._session.request') as mock_request:
+            mock_request.side_effect = [rate_limited_response, server_error_response, response]
+            self.assertEqual([], repo.list_releases(100, 1))
+            self.assertEqual(3, mock_request.call_count)
+
+        rate_limit_status = get_rate_limit_status()
+        self.assertEqual(retry_count + 2, rate_limit_status.retry_count)
+        self.assertEqual(4999, rate_limit_status.remaining)
+        self.assertEqual(1636608276, rate_limit_status.reset_epoch)
+
+        # not retry on client error
+        not_found_response = mock.Mock(status_code=404, headers={}, json=mock.Mock(return_value={}))
+        not_found_response.raise_for_status.side_effect = RuntimeError('404')
+        with mock.patch('github._session.request') as mock_request:
+            mock_request.return_value = not_found_response
+            self.assertRaises(RuntimeError, repo.list_releases, 100, 1)
+            self.assertEqual(1, mock_request.call_count)
+
+        # not retry POST on server error, as it could have been processed
+        server_error_response.json = mock.Mock(return_value={})
+        server_error_response.raise_for_status.side_effect = RuntimeError('502')
+        with mock.patch('github._session.request') as mock_request:
+            mock_request.return_value = server_error_response
+            self.assertRaises(RuntimeError, repo.create_pull_request, 'title', 'head', 'main')
+            self.assertEqual(1, mock_request.call_count)
+
+        # retry POST on rate limit
+        created_response = mock.Mock(status_code=201, headers={}, json=mock.Mock(return_value={'number': 1}))
+        with mock.patch('github._session.request') as mock_request:
+            mock_request.side_effect = [rate_limited_response, created_response]
+            self.assertEqual(1, repo.create_pull_request('title', 'head', 'main'))
+            self.assertEqual(2, mock_request.call_count)
+
+    def test_list_pull_requests(self):
+        repo = GitHubRepository('Azure', 'azure-rest-api-specs-examples', 'token')
+
+        page1 = [{'number': i, 'title': f'[Automation] {i}'} for i in range(100)]
+        page2 = [{'number': 100, 'title': '[Automation] 100'}]
+        with mock.patch('github._session.request') as mock_request:
+            mock_request.side_effect = [mock.Mock(status_code=200, headers={}, json=mock.Mock(return_value=page1)),
+                                        mock.Mock(status_code=200, headers={}, json=mock.Mock(return_value=page2))]
+            pull_requests = repo.list_pull_requests()
+            self.assertEqual(101, len(pull_requests))
+            self.assertEqual(2, mock_request.call_args.kwargs['params']['page'])
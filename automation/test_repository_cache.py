@@ -0,0 +1,71 @@
+import os
+import unittest
+import shutil
+import subprocess
+from os import path
+
+from repository_cache import RepositoryCache
+
+
+class TestRepositoryCache(unittest.TestCase):
+
+    def test(self):
+        work_dir = path.abspath('repository_cache_test')
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+
+        # prepare a repository with 2 tags
+        repository_path = path.join(work_dir, 'origin')
+        os.makedirs(repository_path)
+        subprocess.check_call(['git', 'init', '--quiet', '--initial-branch=main'], cwd=repository_path)
+        for package in ['package1', 'package2']:
+            with open(path.join(repository_path, package + '.txt'), 'w') as f:
+                f.write(package)
+            subprocess.check_call(['git', 'add', '--all'], cwd=repository_path)
+            subprocess.check_call(['git', '-c', 'user.name=test', '-c', 'user.email=test@test',
+                                   'commit', '--quiet', '-m', package], cwd=repository_path)
+            subprocess.check_call(['git', 'tag', package + '_1.0.0'], cwd=repository_path)
+
+        repository = 'file://' + repository_path
+        cache = RepositoryCache(path.join(work_dir, 'cache'))
+        cache.fetch(repository, ['package1_1.0.0'])
+
+        work_path1 = path.join(work_dir, 'work1')
+        cache.checkout(repository, 'package1_1.0.0', work_path1)
+        self.assertTrue(path.isfile(path.join(work_path1, 'package1.txt')))
+        self.assertFalse(path.isfile(path.join(work_path1, 'package2.txt')))
+
+        # tag not yet in mirror
+        work_path2 = path.join(work_dir, 'work2')
+        cache.checkout(repository, 'package2_1.0.0', work_path2)
+        self.assertTrue(path.isfile(path.join(work_path2, 'package2.txt')))
+
+        cache.remove(repository, work_path1)
+        cache.remove(repository, work_path2)
+        self.assertFalse(path.exists(work_path1))
+        self.assertFalse(path.exists(work_path2))
+
+        # branch, and new local branch in working copy
+        cache.fetch_branch(repository, 'main')
+        work_path4 = path.join(work_dir, 'work4')
+        cache.checkout_branch(repository, 'main', work_path4)
+        self.assertTrue(path.isfile(path.join(work_path4, 'package2.txt')))
+        subprocess.check_call(['git', 'checkout', '--quiet', '-b', 'new_branch'], cwd=work_path4)
+        cache.remove(repository, work_path4, 'new_branch')
+        self.assertFalse(path.exists(work_path4))
+        mirror_path = path.join(work_dir, 'cache', os.listdir(path.join(work_dir, 'cache'))[0])
+        self.assertEqual(b'', subprocess.check_output(['git', 'branch', '--list', 'new_branch'], cwd=mirror_path))
+
+        # sparse checkout from partial clone
+        subprocess.check_call(['git', 'config', 'uploadpack.allowFilter', 'true'], cwd=repository_path)
+        subprocess.check_call(['git', 'config', 'uploadpack.allowAnySHA1InWant', 'true'], cwd=repository_path)
+        sparse_cache = RepositoryCache(path.join(work_dir, 'sparse_cache'))
+        sparse_cache.fetch(repository, ['package2_1.0.0'], blob_filter=True)
+
+        work_path3 = path.join(work_dir, 'work3')
+        sparse_cache.checkout(repository, 'package2_1.0.0', work_path3, ['/package2.txt'])
+        self.assertTrue(path.isfile(path.join(work_path3, 'package2.txt')))
+        self.assertFalse(path.isfile(path.join(work_path3, 'package1.txt')))
+        sparse_cache.remove(repository, work_path3)
+
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,120 @@
+import os
+import unittest
+import shutil
+from datetime import datetime
+from os import path
+
+from database import Database
+from csv_database import CsvDatabase
+from sqlite_database import SqliteDatabase
+
+
+class TestSqliteDatabase(unittest.TestCase):
+
+    def test(self):
+        csv_release_content = '''id,name,language,tag,package,version,date_epoch,date
+1,com.azure.resourcemanager:azure-resourcemanager-confluent:1.0.0-beta.3,java,azure-resourcemanager-confluent_1.0.0-beta.3,azure-resourcemanager-confluent,1.0.0-beta.3,1636608276,11/11/2021
+2,com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.0-beta.3,java,azure-resourcemanager-signalr_1.0.0-beta.3,azure-resourcemanager-signalr,1.0.0-beta.3,1636606853,11/11/2021
+'''
+
+        csv_file_content = '''id,file,release_id
+1,specification/confluent/resource-manager/Microsoft.Confluent/preview/2021-09-01-preview/examples-java/MarketplaceAgreements_Create.java,1
+2,specification/confluent/resource-manager/Microsoft.Confluent/preview/2021-09-01-preview/examples-java/MarketplaceAgreements_List.java,1
+3,specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/SignalR_Get.java,2
+4,specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/Usages_List.java,2
+'''
+
+        work_dirs = [path.abspath('sqlite_database_test_csv'), path.abspath('sqlite_database_test_sqlite')]
+        for work_dir in work_dirs:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            os.makedirs(path.join(work_dir, 'csvdb'))
+            with open(path.join(work_dir, 'csvdb', 'java-library-example-index.csv'), 'w', newline='') as csv_file:
+                csv_file.write(csv_release_content)
+            with open(path.join(work_dir, 'csvdb', 'java-library-example-list.csv'), 'w', newline='') as csv_file:
+                csv_file.write(csv_file_content)
+
+        csv_db = CsvDatabase(work_dirs[0])
+        sqlite_db = SqliteDatabase(work_dirs[1], path.join(work_dirs[1], 'csvdb.sqlite'))
+        for test_db in [csv_db, sqlite_db]:
+            test_db.load()
+            self.assertEqual(2, len(test_db.query_releases('java')))
+
+            # new release replaces the last file
+            self.assertTrue(test_db.new_release(
+                'com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.0', 'java',
+                'azure-resourcemanager-signalr_1.0.0', 'azure-resourcemanager-signalr',
+                '1.0.0', datetime.fromtimestamp(1636903745),
+                ['specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/SignalR_Get.java',
+                 'specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/SignalR_Delete.java']))
+            self.assertTrue(test_db.new_release(
+                'com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.1', 'java',
+                'azure-resourcemanager-signalr_1.0.1', 'azure-resourcemanager-signalr',
+                '1.0.1', datetime.fromtimestamp(1637003745),
+                ['specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/SignalR_Delete.java']))
+            # release already exists
+            self.assertFalse(test_db.new_release(
+                'com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.1', 'java',
+                'azure-resourcemanager-signalr_1.0.1', 'azure-resourcemanager-signalr',
+                '1.0.1', datetime.fromtimestamp(1637003745), []))
+            test_db.dump()
+
+        self.assertEqual(csv_db.query_releases('java'), sqlite_db.query_releases('java'))
+        self.assertEqual([], sqlite_db.query_releases('go'))
+        self.assertEqual(csv_db.query_release_tags('java'), sqlite_db.query_release_tags('java'))
+
+        # exported CSV files are the same
+        for filename in ['java-library-example-index.csv', 'java-library-example-list.csv']:
+            with open(path.join(work_dirs[0], 'csvdb', filename), 'rb') as f0, \
+                    open(path.join(work_dirs[1], 'csvdb', filename), 'rb') as f1:
+                self.assertEqual(f0.read(), f1.read())
+
+        release = sqlite_db.query_file_release(
+            'specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/SignalR_Delete.java')
+        self.assertEqual('azure-resourcemanager-signalr_1.0.1', release.tag)
+        release = sqlite_db.query_file_release(
+            'specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/SignalR_Get.java')
+        self.assertEqual('azure-resourcemanager-signalr_1.0.0', release.tag)
+        self.assertIsNone(sqlite_db.query_file_release('specification/unknown.java'))
+
+        releases = sqlite_db.query_releases_since('java', datetime.fromtimestamp(1636903745))
+        self.assertEqual(['1.0.0', '1.0.1'], [release.version for release in releases])
+
+        # reload from exported CSV
+        sqlite_db.load()
+        self.assertEqual(4, len(sqlite_db.query_releases('java')))
+
+        sqlite_db.connection.close()
+        for work_dir in work_dirs:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def test_journal(self):
+        work_dir = path.abspath('sqlite_database_test_journal')
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(path.join(work_dir, 'csvdb'))
+        with open(path.join(work_dir, 'csvdb', 'java-library-example-index.csv'), 'w', newline='') as csv_file:
+            csv_file.write('id,name,language,tag,package,version,date_epoch,date\n')
+        with open(path.join(work_dir, 'csvdb', 'java-library-example-list.csv'), 'w', newline='') as csv_file:
+            csv_file.write('id,file,release_id\n')
+        journal_path = path.join(work_dir, 'journal.jsonl')
+
+        # journal and commit are common to storages
+        sqlite_db = SqliteDatabase(work_dir, journal_path=journal_path, commit_batch_size=0)
+        self.assertIsInstance(sqlite_db, Database)
+        sqlite_db.load()
+        self.assertTrue(sqlite_db.new_release(
+            'com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.0', 'java',
+            'azure-resourcemanager-signalr_1.0.0', 'azure-resourcemanager-signalr',
+            '1.0.0', datetime.fromtimestamp(1636903745),
+            ['specification/signalr/resource-manager/Microsoft.SignalRService/stable/2021-10-01/examples-java/SignalR_Get.java']))
+        sqlite_db.commit('com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.0')
+        self.assertEqual(['com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.0'], sqlite_db.pending_tags)
+        sqlite_db.connection.close()
+
+        # release not pushed is replayed at load
+        sqlite_db = SqliteDatabase(work_dir, journal_path=journal_path)
+        sqlite_db.load()
+        self.assertEqual(['com.azure.resourcemanager:azure-resourcemanager-signalr:1.0.0'], sqlite_db.pending_tags)
+        self.assertEqual({'azure-resourcemanager-signalr_1.0.0'}, sqlite_db.query_release_tags('java'))
+
+        sqlite_db.connection.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
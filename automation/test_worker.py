@@ -0,0 +1,66 @@
+import os
+import unittest
+import shutil
+from os import path
+from datetime import datetime
+
+import models
+from models import Release, WorkerInput
+from worker import run_worker_in_process
+
+
+class TestWorker(unittest.TestCase):
+
+    def test_run_worker_in_process(self):
+        work_dir = path.abspath('worker_test')
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+        sdk_path = path.join(work_dir, 'sdk')
+        samples_path = path.join(sdk_path, 'sdk', 'foo', 'azure-mgmt-foo', 'generated_samples')
+        os.makedirs(samples_path)
+        with open(path.join(samples_path, 'get.py'), 'w', encoding='utf-8') as f:
+            f.write('''# coding=utf-8
+
+from azure.mgmt.foo import FooClient
+
+
+def main():
+    client = FooClient()
+    client.get()
+
+
+# x-ms-original-file: specification/foo/resource-manager/Microsoft.Foo/stable/2022-01-01/examples/Get.json
+if __name__ == "__main__":
+    main()
+''')
+        sdk_examples_path = path.join(work_dir, 'example')
+        os.makedirs(sdk_examples_path)
+
+        release = Release('azure-mgmt-foo_1.0.0', 'azure-mgmt-foo', '1.0.0', datetime.now())
+        worker_input = WorkerInput(path.join(work_dir, 'spec'), sdk_examples_path, sdk_path, work_dir, release)
+        module_path = path.join(path.dirname(path.abspath(__file__)), '..', 'python', 'main.py')
+
+        worker_output = run_worker_in_process(module_path, worker_input)
+        self.assertTrue(worker_output.succeeded)
+        self.assertEqual('azure-mgmt-foo@1.0.0', worker_output.name)
+        self.assertIn('specification/foo/resource-manager/Microsoft.Foo/stable/2022-01-01/examples-python/Get.py',
+                      worker_output.files)
+        self.assertTrue(path.isfile(path.join(sdk_examples_path, 'specification/foo/resource-manager/Microsoft.Foo/'
+                                                                 'stable/2022-01-01/examples-python/Get.py')))
+
+        # modules of automation are not replaced by modules of worker
+        import models as models_after
+        self.assertIs(models, models_after)
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    def test_load_worker_module_with_sibling_modules(self):
+        # "models" of go worker has the same name as "models" of automation
+        module_path = path.join(path.dirname(path.abspath(__file__)), '..', 'go', 'main.py')
+
+        from worker import _load_worker_module
+        module1 = _load_worker_module(module_path)
+        module2 = _load_worker_module(module_path)
+        self.assertIsNot(module1, module2)
+        self.assertIs(module1.GoExample, module2.GoExample)
+        self.assertTrue(hasattr(models, 'WorkerInput'))
@@ -0,0 +1,75 @@
+import sys
+import os
+from os import path
+import json
+import subprocess
+import threading
+import logging
+import importlib.util
+from types import ModuleType
+from typing import Dict
+
+from models import WorkerInput, WorkerOutput
+
+
+# worker modules share names with each other (e.g. "models"), guard the swap of sys.modules
+_import_lock: threading.Lock = threading.Lock()
+# sibling modules of each worker, keyed by worker folder
+_worker_modules: Dict[str, Dict[str, ModuleType]] = {}
+
+
+def run_worker_script(script: str, root_path: str, tmp_path: str, worker_input: WorkerInput) -> WorkerOutput:
+    # run worker as shell script, communicate via "input.json" and "output.json"
+
+    input_json_path = path.join(tmp_path, 'input.json')
+    output_json_path = path.join(tmp_path, 'output.json')
+    with open(input_json_path, 'w', encoding='utf-8') as f_out:
+        json.dump(worker_input.to_json(), f_out, indent=2)
+
+    logging.info(f'Running worker: {script}')
+    subprocess.check_call([script, input_json_path, output_json_path], cwd=root_path)
+
+    if path.isfile(output_json_path):
+        with open(output_json_path, 'r', encoding='utf-8') as f_in:
+            output = json.load(f_in)
+            logging.info(f'Output JSON from worker: {output}')
+            return WorkerOutput.from_json(output)
+    else:
+        return WorkerOutput(worker_input.release.tag, True, [])
+
+
+def run_worker_in_process(module_path: str, worker_input: WorkerInput) -> WorkerOutput:
+    # run worker in current process, via the "run" function of the worker module
+
+    logging.info(f'Running worker in process: {module_path}')
+    module = _load_worker_module(module_path)
+    output = module.run(worker_input.to_json())
+    logging.info(f'Output from worker: {output}')
+    return WorkerOutput.from_json(output)
+
+
+def _load_worker_module(module_path: str) -> ModuleType:
+    # load a fresh instance of the worker module, so that its global variables are not shared among releases
+    # its sibling modules are loaded once and reused
+
+    module_path = path.abspath(module_path)
+    worker_path = path.dirname(module_path)
+    worker_name = path.basename(worker_path)
+    sibling_names = [path.splitext(filename)[0] for filename in os.listdir(worker_path)
+                     if filename.endswith('.py') and path.join(worker_path, filename) != module_path]
+
+    with _import_lock:
+        hidden_modules = {name: sys.modules.pop(name) for name in sibling_names if name in sys.modules}
+        sys.modules.update(_worker_modules.get(worker_path, {}))
+        sys.path.insert(0, worker_path)
+        try:
+            spec = importlib.util.spec_from_file_location(f'{worker_name}_worker', module_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.script_path = worker_path
+        finally:
+            sys.path.remove(worker_path)
+            _worker_modules[worker_path] = {name: sys.modules.pop(name) for name in sibling_names
+                                            if name in sys.modules}
+            sys.modules.update(hidden_modules)
+    return module
@@ -253,24 +253,10 @@ def create_go_examples(release: Release,
         return True, files
 
 
-def main():
-    global script_path
-    global tmp_path
-
-    logging.basicConfig(level=logging.INFO,
-                        format='%(asctime)s [%(levelname)s] %(message)s',
-                        datefmt='%Y-%m-%d %X')
+def run(config: dict) -> dict:
+    # process the release, "config" and returned value follow the schema of "input.json" and "output.json"
 
-    script_path = path.abspath(path.dirname(sys.argv[0]))
-
-    parser = argparse.ArgumentParser(description='Requires 2 arguments, path of "input.json" and "output.json".')
-    parser.add_argument('paths', metavar='path', type=str, nargs=2,
-                        help='path of "input.json" or "output.json"')
-    args = parser.parse_args()
-    input_json_path = args.paths[0]
-    output_json_path = args.paths[1]
-    with open(input_json_path, 'r', encoding='utf-8') as f_in:
-        config = json.load(f_in)
+    global tmp_path
 
     sdk_path = config['sdkPath']
     sdk_examples_path = config['sdkExamplesPath']
@@ -290,12 +276,35 @@ def main():
 
     succeeded, files = create_go_examples(release, go_module, go_mod_filepath, sdk_examples_path, go_examples_path)
 
+    output = {
+        'status': 'succeeded' if succeeded else 'failed',
+        'name': go_module,
+        'files': files
+    }
+    return output
+
+
+def main():
+    global script_path
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s [%(levelname)s] %(message)s',
+                        datefmt='%Y-%m-%d %X')
+
+    script_path = path.abspath(path.dirname(sys.argv[0]))
+
+    parser = argparse.ArgumentParser(description='Requires 2 arguments, path of "input.json" and "output.json".')
+    parser.add_argument('paths', metavar='path', type=str, nargs=2,
+                        help='path of "input.json" or "output.json"')
+    args = parser.parse_args()
+    input_json_path = args.paths[0]
+    output_json_path = args.paths[1]
+    with open(input_json_path, 'r', encoding='utf-8') as f_in:
+        config = json.load(f_in)
+
+    output = run(config)
+
     with open(output_json_path, 'w', encoding='utf-8') as f_out:
-        output = {
-            'status': 'succeeded' if succeeded else 'failed',
-            'name': go_module,
-            'files': files
-        }
         json.dump(output, f_out, indent=2)
 
 
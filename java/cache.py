@@ -0,0 +1,89 @@
+import os
+from os import path
+import hashlib
+import threading
+import logging
+from typing import Optional
+
+
+class ExampleCache:
+    # content-addressed cache on disk, for result of format and compile of Java examples
+    # least recently used entries are evicted, when total size exceeds max_size
+
+    cache_path: str
+    max_size: int
+
+    _size: Optional[int]
+    _lock: threading.Lock
+
+    def __init__(self, cache_path: str, max_size: int = 256 * 1024 * 1024):
+        self.cache_path = cache_path
+        self.max_size = max_size
+        # approximate total size of entries, computed on first put, corrected at eviction
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8', newline='') as f:
+                value = f.read()
+            # mark as recently used
+            os.utime(entry_path)
+            return value
+        except OSError:
+            return None
+
+    def put(self, key: str, value: str):
+        entry_path = self._entry_path(key)
+        os.makedirs(path.dirname(entry_path), exist_ok=True)
+        # write to temporary file then replace, so that a concurrent reader never sees partial file
+        tmp_entry_path = f'{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_entry_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(value)
+        os.replace(tmp_entry_path, entry_path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._list_entries())
+            else:
+                self._size += path.getsize(entry_path)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        # remove least recently used entries, until 3/4 of max_size
+        entries = sorted(self._list_entries(), key=lambda entry: entry[2])
+        self._size = sum(size for _, size, _ in entries)
+        for entry_path, size, _ in entries:
+            if self._size <= self.max_size * 3 // 4:
+                break
+            try:
+                os.remove(entry_path)
+                self._size -= size
+            except OSError:
+                pass
+        logging.info(f'Cache evicted, size: {self._size}')
+
+    def _list_entries(self):
+        # (path, size, last access time) of entries
+        entries = []
+        if path.isdir(self.cache_path):
+            for folder in os.scandir(self.cache_path):
+                if folder.is_dir():
+                    for entry in os.scandir(folder.path):
+                        if entry.is_file() and not entry.name.endswith('.tmp'):
+                            stat = entry.stat()
+                            entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _entry_path(self, key: str) -> str:
+        return path.join(self.cache_path, key[:2], key)
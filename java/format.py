@@ -1,60 +1,158 @@
+import os
 from os import path
+import glob
 import shutil
 import platform
 import subprocess
 import tempfile
+import threading
+import contextlib
 import logging
-from typing import List
+from typing import List, Dict, Optional
 
 from modules import JavaExample, JavaFormatResult
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 
 OS_WINDOWS = platform.system().lower() == 'windows'
 
+# marker of a workspace that had a successful run, plugins are then resolved from local repository
+WARM_MARKER_FILENAME = '.warm'
+
+# workspace or local repository is shared by releases processed in parallel
+_folder_locks: Dict[str, threading.Lock] = {}
+_folder_locks_lock: threading.Lock = threading.Lock()
+
 
 class JavaFormat:
     tmp_path: str
     maven_path: str
+    workspace_path: Optional[str]
+    repository_path: Optional[str]
 
-    def __init__(self, tmp_path: str, maven_path: str):
+    def __init__(self, tmp_path: str, maven_path: str, workspace_path: Optional[str] = None,
+                 repository_path: Optional[str] = None):
         self.tmp_path = tmp_path
         self.maven_path = maven_path
+        # if provided, the workspace is reused by later format, and maven daemon is used if available
+        self.workspace_path = workspace_path
+        # if provided, local maven repository shared with compile of examples
+        self.repository_path = repository_path
 
     def format(self, examples: List[JavaExample]) -> JavaFormatResult:
-        with tempfile.TemporaryDirectory(dir=self.tmp_path) as tmp_dir_name:
-            files = ['pom.xml', 'eclipse-format-azure-sdk-for-java.xml']
-            for file in files:
-                shutil.copyfile(path.join(self.maven_path, file), path.join(tmp_dir_name, file))
-
-            filename_no = 1
-            for example in examples:
-                filename = 'Code' + str(filename_no) + '.java'
-                filename_no += 1
-
-                filepath = path.join(tmp_dir_name, filename)
-
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(example.content)
-
-            logging.info('Format java code')
-            cmd = ['mvn' + ('.cmd' if OS_WINDOWS else ''), 'spotless:apply']
+        if self.workspace_path:
+            os.makedirs(self.workspace_path, exist_ok=True)
+            with lock_folder(self.workspace_path):
+                return self.__format(self.workspace_path, examples)
+        else:
+            with tempfile.TemporaryDirectory(dir=self.tmp_path) as tmp_dir_name:
+                return self.__format(tmp_dir_name, examples)
+
+    def __format(self, work_path: str, examples: List[JavaExample]) -> JavaFormatResult:
+        files = ['pom.xml', 'eclipse-format-azure-sdk-for-java.xml']
+        for file in files:
+            _copy_if_changed(path.join(self.maven_path, file), path.join(work_path, file))
+
+        # remove code of previous format
+        for filepath in glob.glob(path.join(work_path, 'Code*.java')):
+            os.remove(filepath)
+
+        filename_no = 1
+        for example in examples:
+            filename = 'Code' + str(filename_no) + '.java'
+            filename_no += 1
+
+            filepath = path.join(work_path, filename)
+
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(example.content)
+
+        logging.info('Format java code')
+        warm_marker_path = path.join(work_path, WARM_MARKER_FILENAME)
+        offline = self.workspace_path is not None and path.isfile(warm_marker_path)
+        cmd = [_maven_command(self.workspace_path is not None)] \
+            + ([f'-Dmaven.repo.local={self.repository_path}'] if self.repository_path else []) \
+            + (['--offline'] if offline else []) \
+            + ['spotless:apply']
+        logging.info('Command line: ' + ' '.join(cmd))
+        result = self.__run(cmd, work_path, offline)
+
+        if result.returncode and offline:
+            # plugins in local repository could be incomplete, retry online
+            os.remove(warm_marker_path)
+            cmd.remove('--offline')
             logging.info('Command line: ' + ' '.join(cmd))
-            result = subprocess.run(cmd, cwd=tmp_dir_name)
-
-            if result.returncode:
-                return JavaFormatResult(False, [])
-
-            # read formatted examples from java files
-            formatted_examples = []
-            filename_no = 1
-            for example in examples:
-                filename = 'Code' + str(filename_no) + '.java'
-                filename_no += 1
-
-                filepath = path.join(tmp_dir_name, filename)
-
-                with open(filepath, encoding='utf-8') as f:
-                    content = f.read()
-                    formatted_examples.append(JavaExample(example.target_filename, example.target_dir, content))
-
-            return JavaFormatResult(True, formatted_examples)
+            result = self.__run(cmd, work_path, False)
+
+        if result.returncode:
+            return JavaFormatResult(False, [])
+
+        if self.workspace_path is not None:
+            with open(warm_marker_path, 'w'):
+                pass
+
+        # read formatted examples from java files
+        formatted_examples = []
+        filename_no = 1
+        for example in examples:
+            filename = 'Code' + str(filename_no) + '.java'
+            filename_no += 1
+
+            filepath = path.join(work_path, filename)
+
+            with open(filepath, encoding='utf-8') as f:
+                content = f.read()
+                formatted_examples.append(JavaExample(example.target_filename, example.target_dir, content))
+
+        return JavaFormatResult(True, formatted_examples)
+
+    def __run(self, cmd: List[str], work_path: str, offline: bool) -> subprocess.CompletedProcess:
+        # online run could download plugins to the shared local repository
+        if self.repository_path and not offline:
+            os.makedirs(self.repository_path, exist_ok=True)
+            with lock_folder(self.repository_path):
+                return subprocess.run(cmd, cwd=work_path)
+        return subprocess.run(cmd, cwd=work_path)
+
+
+def _maven_command(prefer_daemon: bool) -> str:
+    # maven daemon keeps JVM and plugins warm between runs, it is installed by the pipelines
+    # fall back to maven if it is not available
+    if prefer_daemon and shutil.which('mvnd'):
+        return 'mvnd' + ('.cmd' if OS_WINDOWS else '')
+    return 'mvn' + ('.cmd' if OS_WINDOWS else '')
+
+
+def _copy_if_changed(source_path: str, target_path: str):
+    # keep the file untouched if same, so that maven does not consider the project changed
+    with open(source_path, 'rb') as f:
+        content = f.read()
+    if path.isfile(target_path):
+        with open(target_path, 'rb') as f:
+            if f.read() == content:
+                return
+    shutil.copyfile(source_path, target_path)
+
+
+@contextlib.contextmanager
+def lock_folder(folder_path: str):
+    # lock among threads, and among processes if supported by OS
+    with _folder_locks_lock:
+        if folder_path not in _folder_locks:
+            _folder_locks[folder_path] = threading.Lock()
+        lock = _folder_locks[folder_path]
+
+    with lock:
+        if fcntl:
+            with open(path.join(folder_path, '.lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        else:
+            yield
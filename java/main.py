@@ -2,18 +2,21 @@ import sys
 import os
 from os import path
 import json
+import hashlib
 import argparse
 import logging
 import dataclasses
-from typing import List
+from typing import List, Optional
 
 from modules import JavaExample, JavaFormatResult
 from package import MavenPackage
 from format import JavaFormat
+from cache import ExampleCache
 
 
 script_path: str = '.'
 tmp_path: str
+cache_path: Optional[str] = None
 
 namespace = 'com.azure.resourcemanager'
 
@@ -53,76 +56,65 @@ def get_sdk_name_from_package(package: str) -> str:
         return package[len('azure-resourcemanager-'):]
 
 
-def is_aggregated_java_example(lines: List[str]) -> bool:
-    # check metadata to see if the sample Java is a candidate for example extraction
-
-    for line in lines:
-        if line.strip().startswith(original_file_key):
-            return True
-    return False
-
+def break_down_aggregated_java_example(lines: List[str]) -> AggregatedJavaExample:
+    # break down sample Java to multiple examples, in a single pass of the lines
+    # extraction stops at the first method that is not a valid example
 
-def get_java_example_method(lines: List[str], start: int) -> JavaExampleMethodContent:
-    # extract one example method, start from certain line number
+    aggregated_java_example = AggregatedJavaExample([])
 
+    # line number where the search of current method starts
+    start = 0
     original_file = None
+    # whether the following lines of comment are part of original_file
+    merging_original_file = False
     java_example_method = JavaExampleMethodContent()
-    for index in range(len(lines)):
-        if index < start:
+    for index, line in enumerate(lines):
+        stripped_line = line.strip()
+        if stripped_line.startswith(original_file_key):
+            original_file = stripped_line[len(original_file_key):].strip()
+            merging_original_file = True
             continue
+        elif merging_original_file:
+            if stripped_line == '*/':
+                # end of comment block
+                merging_original_file = False
+            else:
+                # content of original_file breaks into this line of comment
+                original_file = original_file + stripped_line[len('*'):].strip()
 
-        line = lines[index]
-        if line.strip().startswith(original_file_key):
-            original_file = line.strip()[len(original_file_key):].strip()
-            # merge rest of the lines
-            peek_index = index + 1
-            while peek_index < len(lines):
-                peek_line = lines[peek_index]
-                if peek_line.strip() == '*/':
-                    # end of comment block
-                    break
-                else:
-                    # content of original_file breaks into this line of comment
-                    original_file = original_file + peek_line.strip()[len('*'):].strip()
-                peek_index += 1
-        elif line.startswith('    public static void '):
+        if line.startswith('    public static void '):
             # begin of method
             java_example_method.example_relative_path = original_file
             java_example_method.line_start = index
         elif line.startswith('    }'):
             # end of method
             java_example_method.line_end = index + 1
-            break
-
-        index += 1
-
-    if java_example_method.is_valid():
-        # backtrace to include javadoc and comments before the method declaration
-        for index in range(java_example_method.line_start - 1, start - 1, -1):
-            line = lines[index]
-            if line.strip().startswith('*') or line.strip().startswith('/*') or line.strip().startswith('*/') \
-                    or line.strip().startswith('//'):
-                java_example_method.line_start = index
-            else:
+            if not java_example_method.is_valid():
                 break
-        java_example_method.content = lines[java_example_method.line_start:java_example_method.line_end]
-
-    return java_example_method
-
-
-def break_down_aggregated_java_example(lines: List[str]) -> AggregatedJavaExample:
-    # break down sample Java to multiple examples
 
-    aggregated_java_example = AggregatedJavaExample([])
-    java_example_method = get_java_example_method(lines, 0)
-    line_start = java_example_method.line_start
-    line_end = java_example_method.line_end
-    while java_example_method.is_valid():
-        aggregated_java_example.methods.append(java_example_method)
-        line_end = java_example_method.line_end
-        java_example_method = get_java_example_method(lines, java_example_method.line_end)
-    aggregated_java_example.class_opening = lines[0:line_start]
-    aggregated_java_example.class_closing = lines[line_end:]
+            # backtrace to include javadoc and comments before the method declaration
+            for backtrace_index in range(java_example_method.line_start - 1, start - 1, -1):
+                backtrace_line = lines[backtrace_index].strip()
+                if backtrace_line.startswith('*') or backtrace_line.startswith('/*') \
+                        or backtrace_line.startswith('*/') or backtrace_line.startswith('//'):
+                    java_example_method.line_start = backtrace_index
+                else:
+                    break
+            java_example_method.content = lines[java_example_method.line_start:java_example_method.line_end]
+            aggregated_java_example.methods.append(java_example_method)
+
+            # search next method
+            start = index + 1
+            original_file = None
+            merging_original_file = False
+            java_example_method = JavaExampleMethodContent()
+
+    if aggregated_java_example.methods:
+        aggregated_java_example.class_opening = lines[0:aggregated_java_example.methods[0].line_start]
+        aggregated_java_example.class_closing = lines[aggregated_java_example.methods[-1].line_end:]
+    else:
+        aggregated_java_example.class_opening = lines[0:java_example_method.line_start]
+        aggregated_java_example.class_closing = lines[java_example_method.line_end:]
     return aggregated_java_example
 
 
@@ -159,48 +151,95 @@ def process_java_example(filepath: str) -> List[JavaExample]:
 
 def process_java_example_content(lines: List[str], class_name: str) -> List[JavaExample]:
     java_examples = []
-    if is_aggregated_java_example(lines):
-        aggregated_java_example = break_down_aggregated_java_example(lines)
-        for java_example_method in aggregated_java_example.methods:
-            if java_example_method.is_valid():
-                logging.info(f'Processing java example: {java_example_method.example_relative_path}')
+    # break_down_aggregated_java_example finds no method in sample Java that is not aggregated
+    aggregated_java_example = break_down_aggregated_java_example(lines)
+    for java_example_method in aggregated_java_example.methods:
+        if java_example_method.is_valid():
+            logging.info(f'Processing java example: {java_example_method.example_relative_path}')
 
-                # re-construct the example class, from example method
-                example_lines = aggregated_java_example.class_opening + java_example_method.content \
-                                + aggregated_java_example.class_closing
+            # re-construct the example class, from example method
+            example_lines = aggregated_java_example.class_opening + java_example_method.content \
+                            + aggregated_java_example.class_closing
 
-                example_filepath = java_example_method.example_relative_path
-                example_dir, example_filename = path.split(example_filepath)
+            example_filepath = java_example_method.example_relative_path
+            example_dir, example_filename = path.split(example_filepath)
 
-                # use Main as class name
-                old_class_name = class_name
-                new_class_name = 'Main'
-                example_lines = format_java(example_lines, old_class_name, new_class_name)
+            # use Main as class name
+            old_class_name = class_name
+            new_class_name = 'Main'
+            example_lines = format_java(example_lines, old_class_name, new_class_name)
 
-                filename = example_filename.split('.')[0]
-                # use the examples-java folder for Java example
-                md_dir = (example_dir + '-java') if example_dir.endswith('/examples') \
-                    else example_dir.replace('/examples/', '/examples-java/')
+            filename = example_filename.split('.')[0]
+            # use the examples-java folder for Java example
+            md_dir = (example_dir + '-java') if example_dir.endswith('/examples') \
+                else example_dir.replace('/examples/', '/examples-java/')
 
-                java_example = JavaExample(filename, md_dir, ''.join(example_lines))
-                java_examples.append(java_example)
+            java_example = JavaExample(filename, md_dir, ''.join(example_lines))
+            java_examples.append(java_example)
 
     return java_examples
 
 
 def validate_java_examples(release: Release, java_examples: List[JavaExample]) -> JavaFormatResult:
-    # batch validate Java examples
+    # batch validate Java examples, examples failed to compile are dropped
+    # if cache is available, only examples not validated before are formatted and compiled by maven
+
+    format_path = path.join(script_path, 'javaformat')
+    example_cache = ExampleCache(path.join(cache_path, 'examples')) if cache_path else None
+    maven_repository_path = path.join(cache_path, 'm2') if cache_path else None
+
+    # format
+    format_config = get_format_config(format_path)
+    format_keys = [ExampleCache.key('format', format_config, example.content) for example in java_examples]
+    formatted_contents = [example_cache.get(key) if example_cache else None for key in format_keys]
+    missed_indices = [index for index, content in enumerate(formatted_contents) if content is None]
+    if missed_indices:
+        format_workspace_path = path.join(cache_path, 'javaformat') if cache_path else None
+        java_format = JavaFormat(tmp_path, format_path, format_workspace_path, maven_repository_path)
+        java_format_result = java_format.format([java_examples[index] for index in missed_indices])
+        if not java_format_result.succeeded:
+            return java_format_result
+
+        for index, formatted_example in zip(missed_indices, java_format_result.examples):
+            formatted_contents[index] = formatted_example.content
+            if example_cache:
+                example_cache.put(format_keys[index], formatted_example.content)
+    formatted_examples = [JavaExample(example.target_filename, example.target_dir, content)
+                          for example, content in zip(java_examples, formatted_contents)]
+
+    # compile
+    package = f'{release.package}:{release.version}'
+    compile_keys = [ExampleCache.key('compile', package, example.content) for example in java_examples]
+    compile_results = [True if example_cache and example_cache.get(key) is not None else None
+                       for key in compile_keys]
+    missed_indices = [index for index, succeeded in enumerate(compile_results) if succeeded is None]
+    if missed_indices:
+        maven_package = MavenPackage(tmp_path, release.package, release.version, maven_repository_path)
+        missed_results = maven_package.compile_examples([java_examples[index] for index in missed_indices])
+        for index, succeeded in zip(missed_indices, missed_results):
+            compile_results[index] = succeeded
+            if succeeded and example_cache:
+                example_cache.put(compile_keys[index], 'succeeded')
+
+    # fail only if no example compiles, otherwise drop the examples failed to compile
+    if not any(compile_results):
+        return JavaFormatResult(False, formatted_examples)
+    for example, succeeded in zip(java_examples, compile_results):
+        if not succeeded:
+            logging.error(f'Drop example failed to compile: {example.target_dir}/{example.target_filename}')
+    formatted_examples = [example for example, succeeded in zip(formatted_examples, compile_results) if succeeded]
 
-    java_format = JavaFormat(tmp_path, path.join(script_path, 'javaformat'))
-    java_format_result = java_format.format(java_examples)
+    return JavaFormatResult(True, formatted_examples)
 
-    if java_format_result.succeeded:
-        maven_package = MavenPackage(tmp_path, release.package, release.version)
-        succeeded = maven_package.compile(java_examples)
-        if not succeeded:
-            return JavaFormatResult(False, java_format_result.examples)
 
-    return java_format_result
+def get_format_config(format_path: str) -> str:
+    # digest of the configuration of formatter
+
+    digest = hashlib.sha256()
+    for filename in ['pom.xml', 'eclipse-format-azure-sdk-for-java.xml']:
+        with open(path.join(format_path, filename), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
 
 
 def generate_examples(release: Release, sdk_examples_path: str, java_examples: List[JavaExample]) -> List[str]:
@@ -272,9 +311,38 @@ def create_java_examples(release: Release, sdk_examples_path: str, java_examples
         return True, files
 
 
+def run(config: dict) -> dict:
+    # process the release, "config" and returned value follow the schema of "input.json" and "output.json"
+
+    global tmp_path, cache_path
+
+    # specs_path = config['specsPath']
+    sdk_path = config['sdkPath']
+    sdk_examples_path = config['sdkExamplesPath']
+    tmp_path = config['tempPath']
+    cache_path = config.get('cachePath')
+
+    release = Release(config['release']['tag'],
+                      config['release']['package'],
+                      config['release']['version'],
+                      get_sdk_name_from_package(config['release']['package']))
+
+    java_examples_relative_path = path.join('sdk', release.sdk_name, release.package, 'src', 'samples')
+    java_examples_path = path.join(sdk_path, java_examples_relative_path)
+
+    succeeded, files = create_java_examples(release, sdk_examples_path, java_examples_path)
+
+    group = 'com.azure.resourcemanager'
+    output = {
+        'status': 'succeeded' if succeeded else 'failed',
+        'name': f'{group}:{release.package}:{release.version}',
+        'files': files
+    }
+    return output
+
+
 def main():
     global script_path
-    global tmp_path
 
     logging.basicConfig(level=logging.INFO,
                         format='%(asctime)s [%(levelname)s] %(message)s',
@@ -291,28 +359,9 @@ def main():
     with open(input_json_path, 'r', encoding='utf-8') as f_in:
         config = json.load(f_in)
 
-    # specs_path = config['specsPath']
-    sdk_path = config['sdkPath']
-    sdk_examples_path = config['sdkExamplesPath']
-    tmp_path = config['tempPath']
-
-    release = Release(config['release']['tag'],
-                      config['release']['package'],
-                      config['release']['version'],
-                      get_sdk_name_from_package(config['release']['package']))
-
-    java_examples_relative_path = path.join('sdk', release.sdk_name, release.package, 'src', 'samples')
-    java_examples_path = path.join(sdk_path, java_examples_relative_path)
-
-    succeeded, files = create_java_examples(release, sdk_examples_path, java_examples_path)
+    output = run(config)
 
     with open(output_json_path, 'w', encoding='utf-8') as f_out:
-        group = 'com.azure.resourcemanager'
-        output = {
-            'status': 'succeeded' if succeeded else 'failed',
-            'name': f'{group}:{release.package}:{release.version}',
-            'files': files
-        }
         json.dump(output, f_out, indent=2)
 
 
@@ -1,37 +1,89 @@
 import os
 from os import path
+import re
 import platform
 import tempfile
 import subprocess
 import logging
-from typing import List
+from typing import List, Set, Tuple, Optional
 
 from modules import JavaExample
+from format import lock_folder
 
 
 OS_WINDOWS = platform.system().lower() == 'windows'
 
+# folder in local repository, for markers of resolved package
+RESOLVED_MARKER_FOLDER = '.resolved'
+
+COMPILE_ERROR_PATTERN = re.compile(r'^\[ERROR\] .*[/\\]Main(\d+)\.java:\[\d+,\d+\]', re.MULTILINE)
+
 
 def replace_class_name(content: str, old_class_name: str, new_class_name: str) -> str:
     return content.replace('class ' + old_class_name + ' {', 'class ' + new_class_name + ' {', 1)
 
 
+def parse_failed_example_indices(output: str, count: int) -> Set[int]:
+    # index of examples reported by compile errors, e.g. "[ERROR] /tmp/src/main/java/Main2.java:[4,9] cannot find symbol"
+    failed_indices = set()
+    for match in COMPILE_ERROR_PATTERN.finditer(output):
+        index = int(match.group(1)) - 1
+        if 0 <= index < count:
+            failed_indices.add(index)
+    return failed_indices
+
+
 class MavenPackage:
     tmp_path: str
     package: str
     version: str
+    repository_path: Optional[str]
 
-    def __init__(self, tmp_path: str, package: str, version: str):
+    def __init__(self, tmp_path: str, package: str, version: str, repository_path: Optional[str] = None):
         self.tmp_path = tmp_path
         self.package = package
         self.version = version
+        # if provided, local maven repository shared by releases and runs
+        # dependencies of package are resolved once, then compile runs offline
+        self.repository_path = repository_path
 
     def compile(self, examples: List[JavaExample]) -> bool:
+        code, _ = self.__package(examples)
+        return code == 0
+
+    def compile_examples(self, examples: List[JavaExample]) -> List[bool]:
+        # compile, return whether each example compiles
+        # failed examples are identified from compile errors, and the rest is compiled again without them
+        # javac could stop before reporting all errors (e.g. at a syntax error), so repeat until no new failure
+
+        succeeded = [True] * len(examples)
+        remaining_indices = list(range(len(examples)))
+        while remaining_indices:
+            code, output = self.__package([examples[index] for index in remaining_indices])
+            if code == 0:
+                return succeeded
+
+            failed_indices = [remaining_indices[index]
+                              for index in parse_failed_example_indices(output, len(remaining_indices))]
+            if not failed_indices:
+                # failure not attributed to example
+                break
+
+            logging.warning(f'Examples failed to compile: {sorted(index + 1 for index in failed_indices)}')
+            for index in failed_indices:
+                succeeded[index] = False
+            remaining_indices = [index for index in remaining_indices if succeeded[index]]
+        return [False] * len(examples)
+
+    def __package(self, examples: List[JavaExample]) -> Tuple[int, str]:
+        # write examples as Main1.java, Main2.java, etc., and run mvn package
         with tempfile.TemporaryDirectory(dir=self.tmp_path) as tmp_dir_name:
             maven_path = tmp_dir_name
 
             self.__prepare_workspace(maven_path)
 
+            offline = self.__resolve(maven_path)
+
             filename_no = 1
             for example in examples:
                 class_name = 'Main' + str(filename_no)
@@ -43,11 +95,55 @@ class MavenPackage:
                 with open(code_path, 'w', encoding='utf-8') as f:
                     f.write(content)
 
-            cmd = ['mvn' + ('.cmd' if OS_WINDOWS else ''), '--no-transfer-progress', 'package']
+            cmd = self.__maven_command(offline) + ['package']
             logging.info('Run mvn package')
             logging.info('Command line: ' + ' '.join(cmd))
-            code = subprocess.run(cmd, cwd=maven_path).returncode
-            return code == 0
+            code, output = _run_maven(cmd, maven_path)
+            if code and offline and 'offline mode' in output:
+                # artifact not resolved by go-offline, retry online
+                cmd = self.__maven_command(False) + ['package']
+                logging.info('Command line: ' + ' '.join(cmd))
+                with lock_folder(self.repository_path):
+                    code, output = _run_maven(cmd, maven_path)
+            return code, output
+
+    def __resolve(self, maven_path: str) -> bool:
+        # resolve dependencies and plugins to local repository, once for each package and version
+        # return true if resolved, and compile can run offline
+
+        if not self.repository_path:
+            return False
+
+        marker_path = path.join(self.repository_path, RESOLVED_MARKER_FOLDER, f'{self.package}-{self.version}')
+        if path.isfile(marker_path):
+            return True
+
+        # local repository is shared among processes, resolve one package at a time,
+        # so that the marker is only written after the download is complete
+        os.makedirs(self.repository_path, exist_ok=True)
+        with lock_folder(self.repository_path):
+            if path.isfile(marker_path):
+                return True
+
+            cmd = self.__maven_command(False) + ['dependency:go-offline']
+            logging.info(f'Resolve dependencies of {self.package}:{self.version}')
+            logging.info('Command line: ' + ' '.join(cmd))
+            code, _ = _run_maven(cmd, maven_path)
+            if code:
+                return False
+
+            os.makedirs(path.dirname(marker_path), exist_ok=True)
+            with open(marker_path, 'w'):
+                pass
+            return True
+
+    def __maven_command(self, offline: bool) -> List[str]:
+        cmd = ['mvn' + ('.cmd' if OS_WINDOWS else ''), '--no-transfer-progress']
+        if self.repository_path:
+            cmd.append(f'-Dmaven.repo.local={self.repository_path}')
+        if offline:
+            cmd.append('--offline')
+        return cmd
 
     def __prepare_workspace(self, maven_path: str):
         # make dir for maven and src/main/java
@@ -85,6 +181,10 @@ class MavenPackage:
         <version>3.8.1</version>
         <configuration>
           <release>8</release>
+          <compilerArgs>
+            <arg>-Xmaxerrs</arg>
+            <arg>10000</arg>
+          </compilerArgs>
         </configuration>
       </plugin>
     </plugins>
@@ -93,3 +193,11 @@ class MavenPackage:
 '''
         with open(pom_file_path, 'w', encoding='utf-8') as f:
             f.write(pom_str)
+
+
+def _run_maven(cmd: List[str], cwd: str) -> Tuple[int, str]:
+    # run maven, output is logged and returned
+    result = subprocess.run(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            encoding='utf-8', errors='replace')
+    logging.info('Maven output:\n' + result.stdout)
+    return result.returncode, result.stdout
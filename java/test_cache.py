@@ -0,0 +1,100 @@
+import os
+import unittest
+import tempfile
+from os import path
+from unittest import mock
+
+import main
+from cache import ExampleCache
+from modules import JavaExample
+
+
+class TestExampleCache(unittest.TestCase):
+
+    def _create_cache_path(self) -> str:
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        return cache_dir.name
+
+    def _patch_main(self, cache_path: str):
+        # globals of main are restored after test
+        for name, value in [('script_path', path.abspath('.')),
+                            ('tmp_path', tempfile.gettempdir()),
+                            ('cache_path', cache_path)]:
+            patcher = mock.patch.object(main, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_cache(self):
+        cache_path = self._create_cache_path()
+
+        cache = ExampleCache(cache_path, max_size=1000)
+        key1 = ExampleCache.key('format', 'class Main {}')
+        self.assertNotEqual(key1, ExampleCache.key('format', 'class Main {}', ''))
+        self.assertIsNone(cache.get(key1))
+        cache.put(key1, 'class Main {\n}\n')
+        self.assertEqual('class Main {\n}\n', cache.get(key1))
+
+        # least recently used entries are evicted
+        keys = [ExampleCache.key('compile', str(index)) for index in range(10)]
+        for index, key in enumerate(keys):
+            cache.put(key, 'x' * 100)
+            os.utime(cache._entry_path(key), (index, index))
+            cache.get(key1)
+        cache.put(ExampleCache.key('compile', 'last'), 'x' * 100)
+        self.assertEqual('class Main {\n}\n', cache.get(key1))
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual('x' * 100, cache.get(keys[-1]))
+
+        # cache is persisted
+        self.assertEqual('class Main {\n}\n', ExampleCache(cache_path).get(key1))
+
+    def test_validate_java_examples_from_cache(self):
+        cache_path = self._create_cache_path()
+        self._patch_main(cache_path)
+        release = main.Release('azure-resourcemanager-foo_1.0.0', 'azure-resourcemanager-foo', '1.0.0', 'foo')
+        java_examples = [JavaExample('Foo_Get', 'examples-java', 'class Main {}\n')]
+
+        # examples validated before, maven is not required
+        example_cache = ExampleCache(path.join(cache_path, 'examples'))
+        example_cache.put(ExampleCache.key('format', main.get_format_config(path.join(main.script_path, 'javaformat')),
+                                           'class Main {}\n'), 'class Main {\n}\n')
+        example_cache.put(ExampleCache.key('compile', 'azure-resourcemanager-foo:1.0.0', 'class Main {}\n'),
+                          'succeeded')
+
+        result = main.validate_java_examples(release, java_examples)
+        self.assertTrue(result.succeeded)
+        self.assertEqual([JavaExample('Foo_Get', 'examples-java', 'class Main {\n}\n')], result.examples)
+
+    def test_validate_java_examples_partially_from_cache(self):
+        cache_path = self._create_cache_path()
+        self._patch_main(cache_path)
+        release = main.Release('azure-resourcemanager-foo_1.0.0', 'azure-resourcemanager-foo', '1.0.0', 'foo')
+        java_examples = [JavaExample('Foo_Get', 'examples-java', 'class Main {}\n'),
+                         JavaExample('Foo_List', 'examples-java', 'class Main { error }\n')]
+
+        # both formatted before, only the first one compiled before
+        format_config = main.get_format_config(path.join(main.script_path, 'javaformat'))
+        example_cache = ExampleCache(path.join(cache_path, 'examples'))
+        for java_example in java_examples:
+            example_cache.put(ExampleCache.key('format', format_config, java_example.content), java_example.content)
+        example_cache.put(ExampleCache.key('compile', 'azure-resourcemanager-foo:1.0.0', 'class Main {}\n'),
+                          'succeeded')
+
+        compiled_examples = []
+
+        class FailedMavenPackage:
+            def __init__(self, *args):
+                pass
+
+            def compile_examples(self, examples):
+                compiled_examples.extend(examples)
+                return [False] * len(examples)
+
+        with mock.patch.object(main, 'MavenPackage', FailedMavenPackage):
+            result = main.validate_java_examples(release, java_examples)
+
+        # cached example is kept, the other one is dropped
+        self.assertEqual([java_examples[1]], compiled_examples)
+        self.assertTrue(result.succeeded)
+        self.assertEqual([java_examples[0]], result.examples)
@@ -1,4 +1,5 @@
 import unittest
+import tempfile
 from os import path
 
 from modules import JavaExample
@@ -17,4 +18,24 @@ class TestJavaFormat(unittest.TestCase):
         self.assertTrue(result.succeeded)
         self.assertEqual('''class Main {
 }
+''', result.examples[0].content)
+
+    def test_example_workspace(self):
+        tmp_path = path.abspath('.')
+        maven_path = path.abspath('./javaformat')
+        workspace_dir = tempfile.TemporaryDirectory(dir=tmp_path)
+        self.addCleanup(workspace_dir.cleanup)
+        workspace_path = workspace_dir.name
+
+        java_format = JavaFormat(tmp_path, maven_path, workspace_path)
+        # second format runs offline in the same workspace
+        for code in ['class Main {}\n', 'class Main { void run() {} }\n']:
+            result = java_format.format([JavaExample('', '', code), JavaExample('', '', code)])
+            self.assertTrue(result.succeeded)
+            self.assertEqual(2, len(result.examples))
+            self.assertTrue(path.isfile(path.join(workspace_path, '.warm')))
+        self.assertEqual('''class Main {
+    void run() {
+    }
+}
 ''', result.examples[0].content)
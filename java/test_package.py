@@ -1,8 +1,10 @@
 import unittest
+import tempfile
 from os import path
+from unittest import mock
 
 from modules import JavaExample
-from package import MavenPackage
+from package import MavenPackage, parse_failed_example_indices
 
 
 class TestMavenPackage(unittest.TestCase):
@@ -52,3 +54,93 @@ public final class Main {
 }'''
         result = maven_package.compile([JavaExample('', '', code2), JavaExample('', '', code1)])
         self.assertFalse(result)
+
+        # failed example is identified, and the other is kept
+        results = maven_package.compile_examples([JavaExample('', '', code2), JavaExample('', '', code1)])
+        self.assertEqual([False, True], results)
+
+    def test_mixed_errors(self):
+        tmp_path = path.abspath('.')
+        maven_package = MavenPackage(tmp_path, 'azure-resourcemanager-postgresqlflexibleserver', '1.0.0-beta.3')
+
+        code_correct = '''import com.azure.resourcemanager.postgresqlflexibleserver.models.NameAvailabilityRequest;
+public final class Main {
+    public static void main(String[] args) {
+        new NameAvailabilityRequest().withName("name1");
+    }
+}'''
+
+        # code missing "import", reported only after the syntax error is removed
+        code_semantic_error = '''public final class Main {
+    public static void main(String[] args) {
+        new NameAvailabilityRequest().withName("name1");
+    }
+}'''
+
+        # code missing ";"
+        code_syntax_error = '''public final class Main {
+    public static void main(String[] args) {
+        int count = 1
+    }
+}'''
+
+        results = maven_package.compile_examples([JavaExample('', '', code_syntax_error),
+                                                  JavaExample('', '', code_semantic_error),
+                                                  JavaExample('', '', code_correct)])
+        self.assertEqual([False, False, True], results)
+
+    def test_compile_examples_until_no_new_failure(self):
+        maven_package = MavenPackage(path.abspath('.'), 'package', '1.0.0')
+        examples = [JavaExample('', '', content) for content in ['syntax', 'semantic', 'correct']]
+
+        def package(examples_to_compile):
+            # like javac, semantic errors are not reported when there is a syntax error
+            contents = [example.content for example in examples_to_compile]
+            for error in ['syntax', 'semantic']:
+                if error in contents:
+                    return 1, ''.join(f'[ERROR] /tmp/src/main/java/Main{index + 1}.java:[1,1] {error} error\n'
+                                      for index, content in enumerate(contents) if content == error)
+            return 0, ''
+
+        with mock.patch.object(MavenPackage, '_MavenPackage__package', side_effect=package) as package_mock:
+            self.assertEqual([False, False, True], maven_package.compile_examples(examples))
+            self.assertEqual(3, package_mock.call_count)
+
+        # failure not attributed to example
+        with mock.patch.object(MavenPackage, '_MavenPackage__package',
+                               return_value=(1, '[ERROR] Failed to resolve dependencies')):
+            self.assertEqual([False, False, False], maven_package.compile_examples(examples))
+
+    def test_parse_failed_example_indices(self):
+        output = '''[INFO] Compiling 3 source files to /tmp/tmp1/target/classes
+[INFO] -------------------------------------------------------------
+[ERROR] COMPILATION ERROR :
+[INFO] -------------------------------------------------------------
+[ERROR] /tmp/tmp1/src/main/java/Main1.java:[5,22] cannot find symbol
+  symbol:   class NameAvailabilityRequest
+  location: class Main1
+[ERROR] /tmp/tmp1/src/main/java/Main3.java:[2,1] class, interface, or enum expected
+[ERROR] Failed to execute goal org.apache.maven.plugins:maven-compiler-plugin:3.8.1:compile (default-compile)
+[ERROR] /tmp/tmp1/src/main/java/Main1.java:[5,22] cannot find symbol
+'''
+        self.assertEqual({0, 2}, parse_failed_example_indices(output, 3))
+        self.assertEqual(set(), parse_failed_example_indices('[ERROR] Failed to resolve dependencies', 3))
+
+    def test_shared_repository(self):
+        tmp_path = path.abspath('.')
+        repository_dir = tempfile.TemporaryDirectory(dir=tmp_path)
+        self.addCleanup(repository_dir.cleanup)
+        repository_path = repository_dir.name
+        maven_package = MavenPackage(tmp_path, 'azure-resourcemanager-postgresqlflexibleserver', '1.0.0-beta.3',
+                                     repository_path)
+        code = '''import com.azure.resourcemanager.postgresqlflexibleserver.models.NameAvailabilityRequest;
+public final class Main {
+    public static void main(String[] args) {
+        new NameAvailabilityRequest().withName("name1");
+    }
+}'''
+        self.assertTrue(maven_package.compile([JavaExample('', '', code)]))
+        self.assertTrue(path.isfile(path.join(repository_path, '.resolved',
+                                              'azure-resourcemanager-postgresqlflexibleserver-1.0.0-beta.3')))
+        # dependencies are resolved, compile offline
+        self.assertTrue(maven_package.compile([JavaExample('', '', code)]))
@@ -195,3 +195,39 @@ public final class ClustersCreateOrUpdateSamples {
         self.assertTrue('public final class Main {' in java_examples[0].content)
         self.assertEqual('specification/streamanalytics/resource-manager/Microsoft.StreamAnalytics/preview/2020-03-01-preview/examples-java', java_examples[0].target_dir)
         self.assertEqual('Cluster_Create', java_examples[0].target_filename)
+
+    def test_process_java_example_many_methods(self):
+        method_count = 300
+        java_code = '''package com.azure.resourcemanager.foo.generated;
+
+/** Samples for Foo Get. */
+public final class FooGetSamples {
+'''
+        for index in range(method_count):
+            java_code += f'''    /*
+     * x-ms-original-file: specification/foo/resource-manager/Microsoft.Foo/stable/2022-01-01/examples/
+     * Foo_Get{index}.json
+     */
+    /**
+     * Sample code: Foo_Get{index}.
+     *
+     * @param manager Entry point to FooManager.
+     */
+    public static void fooGet{index}(com.azure.resourcemanager.foo.FooManager manager) {{
+        manager.foos().getWithResponse("rg{index}", com.azure.core.util.Context.NONE);
+    }}
+
+'''
+        java_code += '}\n'
+
+        java_examples = process_java_example_content(java_code.splitlines(keepends=True), 'FooGetSamples')
+
+        self.assertEqual(method_count, len(java_examples))
+        for index, java_example in enumerate(java_examples):
+            self.assertEqual(f'Foo_Get{index}', java_example.target_filename)
+            self.assertEqual('specification/foo/resource-manager/Microsoft.Foo/stable/2022-01-01/examples-java',
+                             java_example.target_dir)
+            self.assertIn(f'"rg{index}"', java_example.content)
+            self.assertIn(f'Sample code: Foo_Get{index}.', java_example.content)
+            self.assertEqual(1, java_example.content.count('public static void '))
+            self.assertIn('public final class Main {', java_example.content)
@@ -159,9 +159,37 @@ def get_module_relative_path(sdk_name: str, sdk_path: str) -> str:
     return module_relative_path
 
 
+def run(config: dict) -> dict:
+    # process the release, "config" and returned value follow the schema of "input.json" and "output.json"
+
+    global tmp_path
+
+    sdk_path = config['sdkPath']
+    sdk_examples_path = config['sdkExamplesPath']
+    tmp_path = config['tempPath']
+
+    release = Release(config['release']['tag'],
+                      config['release']['package'],
+                      config['release']['version'])
+
+    js_module = f'{release.package}@{release.version}'
+
+    module_relative_path_local = get_module_relative_path(release.package, sdk_path)
+    python_examples_relative_path = path.join(module_relative_path_local, 'generated_samples')
+    python_examples_path = path.join(sdk_path, python_examples_relative_path)
+
+    succeeded, files = create_python_examples(release, js_module, sdk_examples_path, python_examples_path)
+
+    output = {
+        'status': 'succeeded' if succeeded else 'failed',
+        'name': js_module,
+        'files': files
+    }
+    return output
+
+
 def main():
     global script_path
-    global tmp_path
 
     logging.basicConfig(level=logging.INFO,
                         format='%(asctime)s [%(levelname)s] %(message)s',
@@ -178,28 +206,9 @@ def main():
     with open(input_json_path, 'r', encoding='utf-8') as f_in:
         config = json.load(f_in)
 
-    sdk_path = config['sdkPath']
-    sdk_examples_path = config['sdkExamplesPath']
-    tmp_path = config['tempPath']
-
-    release = Release(config['release']['tag'],
-                      config['release']['package'],
-                      config['release']['version'])
-
-    js_module = f'{release.package}@{release.version}'
-
-    module_relative_path_local = get_module_relative_path(release.package, sdk_path)
-    python_examples_relative_path = path.join(module_relative_path_local, 'generated_samples')
-    python_examples_path = path.join(sdk_path, python_examples_relative_path)
-
-    succeeded, files = create_python_examples(release, js_module, sdk_examples_path, python_examples_path)
+    output = run(config)
 
     with open(output_json_path, 'w', encoding='utf-8') as f_out:
-        output = {
-            'status': 'succeeded' if succeeded else 'failed',
-            'name': js_module,
-            'files': files
-        }
         json.dump(output, f_out, indent=2)
 
 